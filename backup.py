@@ -0,0 +1,50 @@
+from cogs.utils.backup import export, verify, restore
+from cogs.utils.dataIO import dataIO
+import argparse
+import os
+
+#
+#  Backs up and restores everything in data/. Run it from Red's folder,
+#  with Red offline: this process can't flush or pause the bot's pending
+#  writes. While Red is running use the owner command [p]backup instead.
+#
+#  python backup.py export [archive]
+#  python backup.py verify archive
+#  python backup.py restore archive
+#
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backs up Red's data "
+                                     "folder to a .tar.gz and restores it")
+    parser.add_argument("action", choices=("export", "verify", "restore"))
+    parser.add_argument("archive", nargs="?",
+                        help="Defaults to backups/red-<date>.tar.gz on "
+                        "export")
+    args = parser.parse_args()
+
+    if args.action == "export":
+        print("Make sure Red isn't running, otherwise use its backup "
+              "command.")
+        path, manifest = export(args.archive)
+        dataIO.close()
+        print("Backed up {} files to {} ({} bytes)".format(
+            len(manifest["FILES"]), path, os.path.getsize(path)))
+        return
+    if args.archive is None:
+        parser.error("the archive to {} is required".format(args.action))
+    try:
+        if args.action == "verify":
+            manifest = verify(args.archive)
+        else:
+            manifest = restore(args.archive)
+    except ValueError as e:
+        print("{}: {}".format(args.archive, e))
+        exit(1)
+    print("{}: {} files {}".format(
+        args.archive, len(manifest["FILES"]),
+        "OK" if args.action == "verify" else "restored"))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,8 @@
 from discord.ext import commands
 from .utils.chat_formatting import *
-from .utils.dataIO import fileIO
+from .utils.dataIO import fileIO, dataIO
 from .utils import checks
-from __main__ import send_cmd_help
+from __main__ import send_cmd_help, message_pipeline, get_prefix
 import os
 
 
@@ -40,7 +40,7 @@ class Alias:
             self.aliases[server.id] = {}
         if command not in self.bot.commands:
             self.aliases[server.id][command] = to_execute
-            fileIO("data/alias/aliases.json", "save", self.aliases)
+            dataIO.save("data/alias/aliases.json", self.aliases, keys=[server.id])
             await self.bot.say("Alias '{}' added.".format(command))
         else:
             await self.bot.say("Cannot add '{}' because it's a real bot "
@@ -80,7 +80,7 @@ class Alias:
         server = ctx.message.server
         if server.id in self.aliases:
             self.aliases[server.id].pop(command, None)
-            fileIO("data/alias/aliases.json", "save", self.aliases)
+            dataIO.save("data/alias/aliases.json", self.aliases, keys=[server.id])
         await self.bot.say("Alias '{}' deleted.".format(command))
 
     @commands.command(pass_context=True)
@@ -97,22 +97,25 @@ class Alias:
                 message += "```"
                 await self.bot.say(message)
 
-    async def check_aliases(self, message):
-        if message.author.id == self.bot.user.id or \
-                len(message.content) < 2 or message.channel.is_private:
+    async def check_aliases(self, ctx):
+        message = ctx.message
+        if ctx.own or len(message.content) < 2 or ctx.private:
             return
 
         msg = message.content
-        server = message.server
-        prefix = self.get_prefix(msg)
+        server = ctx.server
+        prefix = ctx.prefix
 
         if prefix and server.id in self.aliases:
             if self.first_word(msg[len(prefix):]) in self.aliases[server.id]:
+                if not ctx.allowed:
+                    return
                 alias = self.first_word(msg[len(prefix):])
                 new_command = self.aliases[server.id][alias]
                 args = message.content[len(prefix + alias):]
                 message.content = prefix + new_command + args
                 await self.bot.process_commands(message)
+                return True
 
     def part_of_existing_command(self, alias, server):
         '''Command or alias'''
@@ -133,16 +136,13 @@ class Alias:
                     self.aliases[sid][aliasname] = alias[len(prefix):]
             for alias in to_delete:
                 del self.aliases[sid][alias]
-        fileIO("data/alias/aliases.json", "save", self.aliases)
+        dataIO.save("data/alias/aliases.json", self.aliases)
 
     def first_word(self, msg):
         return msg.split(" ")[0]
 
     def get_prefix(self, msg):
-        for p in self.bot.command_prefix:
-            if msg.startswith(p):
-                return p
-        return None
+        return get_prefix(msg)
 
 
 def check_folder():
@@ -165,5 +165,5 @@ def setup(bot):
     check_file()
     n = Alias(bot)
     n.remove_old()
-    bot.add_listener(n.check_aliases, "on_message")
+    message_pipeline.register(n.check_aliases, message_pipeline.ALIASES)
     bot.add_cog(n)
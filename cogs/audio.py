@@ -3,7 +3,7 @@ from discord.ext import commands
 import threading
 import os
 from random import shuffle, choice
-from cogs.utils.dataIO import fileIO
+from cogs.utils.dataIO import fileIO, dataIO
 from cogs.utils import checks
 from __main__ import send_cmd_help
 import re
@@ -14,6 +14,8 @@ import asyncio
 import math
 import time
 import inspect
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
 
 __author__ = "tekulvw"
 __version__ = "0.0.1"
@@ -50,6 +52,16 @@ youtube_dl_options = {
     'default_search': 'auto'
 }
 
+METADATA_PATH = "data/audio/metadata.json"
+METADATA_TTL = 7 * 24 * 60 * 60  # Seconds before a song is looked up again
+METADATA_MAX = 5000  # Songs kept, least recently used go first
+# Song attributes that are kept. Stream urls expire so they're left out.
+METADATA_FIELDS = ("id", "title", "duration", "webpage_url", "creator",
+                   "uploader", "view_count")
+CACHE_POLICIES = ("lru", "lfu")
+# youtube_dl's files for downloads in progress
+PARTIAL_SUFFIXES = (".part", ".ytdl")
+
 
 class MaximumLength(Exception):
     def __init__(self, m):
@@ -167,21 +179,29 @@ class Playlist:
             return None
 
 
-class Downloader(threading.Thread):
+class Downloader:
+    """A youtube_dl job, run by DownloadService on one of its threads"""
+
     def __init__(self, url, max_duration=None, download=False,
-                 cache_path="data/audio/cache", *args, **kwargs):
-        super().__init__(*args, **kwargs)
+                 cache_path="data/audio/cache", yt=None):
         self.url = url
+        self.requested_url = url  # url is rewritten for searches
         self.max_duration = max_duration
         self.done = False
         self.song = None
+        self.cached = False  # song came from SongInfoCache
         self.failed = False
+        self.future = None  # Resolves to self once done
         self._download = download
-        self._yt = None
+        self._yt = yt
+
+    def is_alive(self):
+        return self.future is not None and not self.done
 
     def run(self):
         try:
-            self.get_info()
+            if self.song is None:  # Might be known already, see SongInfoCache
+                self.get_info()
             if self._download:
                 self.download()
         except:
@@ -196,9 +216,10 @@ class Downloader(threading.Thread):
                 self.song.id))
             return
 
-        if not os.path.isfile('data/audio/cache' + self.song.id):
+        if not os.path.isfile(os.path.join('data/audio/cache', self.song.id)):
             video = self._yt.extract_info(self.url)
             self.song = Song(**video)
+            self.cached = False
 
     def get_info(self):
         if self._yt is None:
@@ -217,6 +238,271 @@ class Downloader(threading.Thread):
         self.song = Song(**video)
 
 
+class SongInfoCache:
+    """What youtube_dl said about each song, so it's asked only once
+
+    Maps a normalized url or search to the song's METADATA_FIELDS. Entries
+    expire after METADATA_TTL and the least recently used ones are dropped
+    past METADATA_MAX. Only used from the event loop."""
+
+    def __init__(self, path=METADATA_PATH, ttl=METADATA_TTL,
+                 max_size=METADATA_MAX):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.entries = collections.OrderedDict()
+        if dataIO.exists(path):
+            now = time.time()
+            saved = dataIO.load(path)
+            for key in sorted(saved, key=lambda k: saved[k]["USED"]):
+                if saved[key]["EXPIRES"] > now:
+                    self.entries[key] = saved[key]
+
+    @staticmethod
+    def key(url):
+        """The same song asked in different ways gives the same key"""
+        if url.startswith("[SEARCH:]"):
+            return "search:" + " ".join(url[9:].casefold().split())
+        url = url.strip()
+        parts = urlsplit(url if "//" in url else "//" + url)
+        host = parts.netloc.lower()
+        for prefix in ("www.", "m."):
+            if host.startswith(prefix):
+                host = host[len(prefix):]
+        query = parse_qs(parts.query)
+        if "list" not in query:  # Playlists are never cached
+            if host in ("youtube.com", "music.youtube.com") and \
+                    "v" in query:
+                return "youtube:" + query["v"][0]
+            if host == "youtu.be":
+                return "youtube:" + parts.path.strip("/")
+        return host + parts.path.rstrip("/") + \
+            ("?" + parts.query if parts.query else "")
+
+    def get(self, url):
+        """Returns a Song for url, or None if it isn't known"""
+        key = self.key(url)
+        entry = self.entries.get(key)
+        now = time.time()
+        if entry is None or entry["EXPIRES"] <= now:
+            if entry is not None:
+                del self.entries[key]
+                self.save(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry["USED"] = now
+        self.entries.move_to_end(key)
+        return Song(**dict(entry["SONG"]))
+
+    def put(self, url, song):
+        if song is None or song.id is None or getattr(song, "entries", None):
+            return
+        now = time.time()
+        key = self.key(url)
+        self.entries[key] = {
+            "SONG": {f: getattr(song, f, None) for f in METADATA_FIELDS},
+            "EXPIRES": now + self.ttl, "USED": now}
+        self.entries.move_to_end(key)
+        changed = [key]
+        while len(self.entries) > self.max_size:
+            changed.append(self.entries.popitem(last=False)[0])
+        self.save(*changed)
+
+    def save(self, *keys):
+        dataIO.save(self.path, self.entries, keys=keys)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class AudioCache:
+    """Index of the downloaded songs in the cache folder
+
+    Tracks the size, last access and number of plays of each file, so the
+    total size is a running count and eviction doesn't rescan the folder.
+    The folder is listed once, on creation; last access starts from the
+    file's mtime and plays from 0."""
+
+    def __init__(self, path="data/audio/cache", policy="lru"):
+        self.path = path
+        self.policy = policy
+        self.files = {}  # song id: {"SIZE": bytes, "USED": time, "HITS": n}
+        self.size = 0  # bytes
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file() and \
+                        not entry.name.endswith(PARTIAL_SUFFIXES):
+                    stat = entry.stat()
+                    self._index(entry.name, stat.st_size, stat.st_mtime)
+
+    def _index(self, song_id, size, used):
+        self._forget(song_id)
+        self.files[song_id] = {"SIZE": size, "USED": used, "HITS": 0}
+        self.size += size
+
+    def _forget(self, song_id):
+        entry = self.files.pop(song_id, None)
+        if entry is not None:
+            self.size -= entry["SIZE"]
+
+    def __contains__(self, song_id):
+        return song_id in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def added(self, song_id):
+        """Indexes a file that was just downloaded
+
+        If it was indexed already only its size is updated, its plays
+        and last access are kept."""
+        try:
+            size = os.path.getsize(os.path.join(self.path, song_id))
+        except OSError:
+            self._forget(song_id)
+            return
+        entry = self.files.get(song_id)
+        if entry is None:
+            self._index(song_id, size, time.time())
+        else:
+            self.size += size - entry["SIZE"]
+            entry["SIZE"] = size
+
+    def hit(self, song_id):
+        """Records a play of song_id"""
+        if song_id not in self.files:
+            self.added(song_id)
+        entry = self.files.get(song_id)
+        if entry is not None:
+            entry["USED"] = time.time()
+            entry["HITS"] += 1
+
+    def _rank(self, song_id):
+        entry = self.files[song_id]
+        if self.policy == "lfu":
+            return (entry["HITS"], entry["USED"])
+        return entry["USED"]
+
+    def evict(self, limit, keep=()):
+        """Deletes the least recently (lru) or least often (lfu) played
+        files, except those in keep, until the cache fits in limit bytes.
+        Returns the bytes freed."""
+        if self.size <= limit:
+            return 0
+        before = self.size
+        victims = sorted((i for i in self.files if i not in keep),
+                         key=self._rank)
+        for song_id in victims:
+            if self.size <= limit:
+                break
+            try:
+                os.remove(os.path.join(self.path, song_id))
+            except FileNotFoundError:
+                pass
+            except OSError:  # In use, or a directory got in the cache
+                continue
+            self._forget(song_id)
+        return before - self.size
+
+
+class DownloadService:
+    """Runs Downloader jobs on a fixed number of threads
+
+    Jobs wait in one queue per server and free threads take them round
+    robin, so a server queueing a long playlist doesn't hold up the
+    others. Requests for a URL that is already queued or running share
+    that job. Each thread keeps its own YoutubeDL instance."""
+
+    def __init__(self, loop, workers=4, info_cache=None, audio_cache=None):
+        self.loop = loop
+        self.info_cache = info_cache
+        self.audio_cache = audio_cache
+        self.workers = workers
+        self.running = 0
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.queues = collections.OrderedDict()  # sid: deque of jobs
+        self.jobs = {}  # (url, download): queued or running job
+        self.deduplicated = 0
+        self._local = threading.local()
+
+    def submit(self, url, max_duration=None, download=False, sid=None):
+        """Queues a job and returns it, await job.future for the result"""
+        key = (url, download)
+        job = self.jobs.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            return job
+        job = Downloader(url, max_duration, download)
+        job.future = self.loop.create_future()
+        if self.info_cache is not None:
+            job.song = self.info_cache.get(url)
+            if job.song is not None:
+                job.cached = True
+                if url.startswith("[SEARCH:]"):
+                    job.url = job.song.webpage_url
+                if not download:
+                    job.done = True
+                    job.future.set_result(job)
+                    return job
+        self.jobs[key] = job
+        self.queues.setdefault(sid, collections.deque()).append((key, job))
+        self._dispatch()
+        return job
+
+    def pending(self):
+        return sum(len(q) for q in self.queues.values())
+
+    def _dispatch(self):
+        while self.running < self.workers and self.queues:
+            sid, jobs = next(iter(self.queues.items()))
+            key, job = jobs.popleft()
+            if jobs:
+                self.queues.move_to_end(sid)
+            else:
+                del self.queues[sid]
+            self.running += 1
+            f = self.loop.run_in_executor(self.executor, self._run, job)
+            f.add_done_callback(
+                lambda f, key=key, job=job: self._finished(key, job))
+
+    def _run(self, job):
+        yt = getattr(self._local, "yt", None)
+        if yt is None:
+            yt = self._local.yt = youtube_dl.YoutubeDL(youtube_dl_options)
+        job._yt = yt
+        job.run()
+
+    def _finished(self, key, job):
+        self.running -= 1
+        if self.jobs.get(key) is job:
+            del self.jobs[key]
+        job.done = True
+        # Only songs youtube_dl resolved in this job, so that the ones
+        # played often still expire and get looked up again
+        if self.info_cache is not None and not (job.failed or job.cached):
+            self.info_cache.put(job.requested_url, job.song)
+        if self.audio_cache is not None and job._download and \
+                not job.failed and job.song is not None:
+            self.audio_cache.added(job.song.id)
+        if not job.future.done():
+            job.future.set_result(job)
+        self._dispatch()
+
+    def shutdown(self):
+        """Cancels the jobs that didn't start, running ones still finish"""
+        for jobs in self.queues.values():
+            for key, job in jobs:
+                if self.jobs.get(key) is job:
+                    del self.jobs[key]
+                job.done = job.failed = True
+                job.future.cancel()
+        self.queues.clear()
+        self.executor.shutdown(wait=False)
+
+
 class Audio:
     """Music Streaming."""
 
@@ -225,25 +511,38 @@ class Audio:
         self.queue = {}  # add deque's, repeat
         self.downloaders = {}  # sid: object
         self.settings = fileIO("data/audio/settings.json", 'load')
+        self.cache_path = "data/audio/cache"
+        self.song_info = SongInfoCache()
+        self.audio_cache = AudioCache(self.cache_path,
+                                      self.settings["CACHE_POLICY"])
+        self.downloads = DownloadService(bot.loop,
+                                         self.settings["DOWNLOAD_WORKERS"],
+                                         self.song_info, self.audio_cache)
+        self.play_requests = {}  # sid: perf_counter() of the play command
+        self.players = {}  # sid: player_loop task
+        self.player_events = {}  # sid: Event set when there's work to do
+        self.play_latencies = collections.deque(maxlen=100)  # seconds
         self.server_specific_setting_keys = ["VOLUME", "QUEUE_MODE",
                                              "VOTE_THRESHOLD"]
-        self.cache_path = "data/audio/cache"
         self.local_playlist_path = "data/audio/localtracks"
 
     def _add_to_queue(self, server, url):
         if server.id not in self.queue:
             self._setup_queue(server)
         self.queue[server.id]["QUEUE"].append(url)
+        self._wake_player(server.id)
 
     def _add_to_temp_queue(self, server, url):
         if server.id not in self.queue:
             self._setup_queue(server)
         self.queue[server.id]["TEMP_QUEUE"].append(url)
+        self._wake_player(server.id)
 
     def _addleft_to_queue(self, server, url):
         if server.id not in self.queue:
-            self._setup_queue()
+            self._setup_queue(server)
         self.queue[server.id]["QUEUE"].appendleft(url)
+        self._wake_player(server.id)
 
     def _cache_desired_files(self):
         filelist = []
@@ -253,7 +552,6 @@ class Audio:
                 filelist.append(song.id)
             except AttributeError:
                 pass
-        shuffle(filelist)
         return filelist
 
     def _cache_max(self):
@@ -265,10 +563,9 @@ class Audio:
         return max([60, 48 * math.log(x) * x**0.3])  # log is not log10
 
     def _cache_required_files(self):
-        queue = copy.deepcopy(self.queue)
         filelist = []
-        for server in queue:
-            now_playing = queue[server].get("NOW_PLAYING")
+        for server in self.queue.values():
+            now_playing = server.get("NOW_PLAYING")
             try:
                 filelist.append(now_playing.id)
             except AttributeError:
@@ -276,10 +573,7 @@ class Audio:
         return filelist
 
     def _cache_size(self):
-        songs = os.listdir(self.cache_path)
-        size = sum(map(lambda s: os.path.getsize(
-            os.path.join(self.cache_path, s)) / 10**6, songs))
-        return size
+        return self.audio_cache.size / 10**6
 
     def _cache_too_large(self):
         if self._cache_size() > self._cache_max():
@@ -335,8 +629,13 @@ class Audio:
 
         log.debug("making player on sid {}".format(server.id))
 
+        # Called from the player's thread once the song ends or is stopped
+        def after(*args):
+            self.bot.loop.call_soon_threadsafe(self._wake_player, server.id)
+
         voice_client.audio_player = voice_client.create_ffmpeg_player(
-            song_filename, use_avconv=use_avconv, options=options)
+            song_filename, use_avconv=use_avconv, options=options,
+            after=after)
 
         return voice_client  # Just for ease of use, it's modified in-place
 
@@ -375,45 +674,40 @@ class Audio:
 
         max_length = self.settings["MAX_LENGTH"]
 
-        while next_dl.is_alive():
-            await asyncio.sleep(0.5)
+        await next_dl.future
 
+        if next_dl.song is None:
+            return
+        if next_dl.song.id in self.audio_cache:
+            # Nothing to download, just keep it from being evicted
+            self.downloaders[server.id] = next_dl
+            return
         if curr_dl.song.id != next_dl.song.id:
             log.debug("downloader ID's mismatch on sid {}".format(server.id) +
                       " gonna start dl-ing the next thing on the queue"
                       " id {}".format(next_dl.song.id))
-            self.downloaders[server.id] = Downloader(next_dl.url, max_length,
-                                                     download=True)
-            self.downloaders[server.id].start()
-
-    def _dump_cache(self, ignore_desired=False):
-        reqd = self._cache_required_files()
+            self.downloaders[server.id] = self.downloads.submit(
+                next_dl.url, max_length, download=True, sid=server.id)
+
+    def _dump_cache(self, limit=None):
+        """Evicts songs until the cache is under limit MB, everything that
+        isn't playing or about to be played if limit is None. Returns the
+        MB dumped."""
+        reqd = set(self._cache_required_files())
         log.debug("required cache files:\n\t{}".format(reqd))
 
-        opt = self._cache_desired_files()
+        opt = set(self._cache_desired_files())
         log.debug("desired cache files:\n\t{}".format(opt))
 
-        prev_size = self._cache_size()
+        target = 0 if limit is None else limit
+        dumped = self.audio_cache.evict(target * 10**6, keep=reqd | opt)
 
-        for file in os.listdir(self.cache_path):
-            if file not in reqd:
-                if ignore_desired or file not in opt:
-                    try:
-                        os.remove(os.path.join(self.cache_path, file))
-                    except OSError:
-                        # A directory got in the cache?
-                        pass
-                    except WindowsError:
-                        # Removing a file in use, reqd failed
-                        pass
-
-        post_size = self._cache_size()
-        dumped = prev_size - post_size
-
-        if not ignore_desired and self._cache_too_large():
+        if self._cache_size() > (limit or self._cache_max()):
             log.debug("must dump desired files")
-            return dumped + self._dump_cache(ignore_desired=True)
+            dumped += self.audio_cache.evict(
+                (limit or self._cache_max()) * 10**6, keep=reqd)
 
+        dumped /= 10**6
         log.debug("dumped {} MB of audio files".format(dumped))
 
         return dumped
@@ -431,24 +725,16 @@ class Audio:
         if server.id not in self.downloaders:  # We don't have a downloader
             log.debug("sid {} not in downloaders, making one".format(
                 server.id))
-            self.downloaders[server.id] = Downloader(url, max_length)
+            self.downloaders[server.id] = self.downloads.submit(
+                url, max_length, sid=server.id)
 
-        if self.downloaders[server.id].url != url:  # Our downloader is old
-            # I'm praying to Jeezus that we don't accidentally lose a running
-            #   Downloader
+        if self.downloaders[server.id].requested_url != url:
+            # Our downloader is old
             log.debug("sid {} in downloaders but wrong url".format(server.id))
-            self.downloaders[server.id] = Downloader(url, max_length)
+            self.downloaders[server.id] = self.downloads.submit(
+                url, max_length, sid=server.id)
 
-        try:
-            # We're assuming we have the right thing in our downloader object
-            self.downloaders[server.id].start()
-            log.debug("starting our downloader for sid {}".format(server.id))
-        except RuntimeError:
-            # Queue manager already started it for us, isn't that nice?
-            pass
-
-        while self.downloaders[server.id].is_alive():  # Getting info w/o DL
-            await asyncio.sleep(0.5)
+        await self.downloaders[server.id].future  # Getting info w/o DL
 
         song = self.downloaders[server.id].song
         log.debug("sid {} wants to play songid {}".format(server.id, song.id))
@@ -457,12 +743,10 @@ class Audio:
         cache_location = os.path.join(self.cache_path, song.id)
         if not os.path.exists(cache_location):
             log.debug("cache miss on song id {}".format(song.id))
-            self.downloaders[server.id] = Downloader(url, max_length,
-                                                     download=True)
-            self.downloaders[server.id].start()
+            self.downloaders[server.id] = self.downloads.submit(
+                url, max_length, download=True, sid=server.id)
 
-            while self.downloaders[server.id].is_alive():
-                await asyncio.sleep(0.5)
+            await self.downloaders[server.id].future
 
             song = self.downloaders[server.id].song
         else:
@@ -593,11 +877,9 @@ class Audio:
 
     async def _parse_sc_playlist(self, url):
         playlist = []
-        d = Downloader(url)
-        d.start()
+        d = self.downloads.submit(url)
 
-        while d.is_alive():
-            await asyncio.sleep(0.5)
+        await d.future
 
         for entry in d.song.entries:
             if entry["url"][4] != "s":
@@ -609,12 +891,10 @@ class Audio:
         return playlist
 
     async def _parse_yt_playlist(self, url):
-        d = Downloader(url)
-        d.start()
+        d = self.downloads.submit(url)
         playlist = []
 
-        while d.is_alive():
-            await asyncio.sleep(0.5)
+        await d.future
 
         for entry in d.song.entries:
             try:
@@ -656,6 +936,14 @@ class Audio:
 
         voice_client.audio_player.start()
         log.debug("starting player on sid {}".format(server.id))
+        if not local:
+            self.audio_cache.hit(song.id)
+        requested = self.play_requests.pop(server.id, None)
+        if requested is not None:
+            latency = time.perf_counter() - requested
+            self.play_latencies.append(latency)
+            log.debug("sid {} started playing {:.0f}ms after the play "
+                      "command".format(server.id, latency * 1000))
 
         return song
 
@@ -762,6 +1050,7 @@ class Audio:
         else:
             self._setup_queue(server)
         self.queue[server.id]["QUEUE"].extend(songlist)
+        self._wake_player(server.id)
 
     def _set_queue_channel(self, server, channel):
         if server.id not in self.queue:
@@ -859,7 +1148,24 @@ class Audio:
 
         self.settings["MAX_CACHE"] = size
         await self.bot.say("Max cache size set to {} MB.".format(size))
-        self.save_settings
+        self.save_settings()
+
+    @audioset.command(name="cachepolicy")
+    @checks.is_owner()
+    async def audioset_cachepolicy(self, policy: str):
+        """Which songs go first when the cache is full
+
+        lru: the ones played least recently
+        lfu: the ones played least often"""
+        policy = policy.lower()
+        if policy not in CACHE_POLICIES:
+            await self.bot.say("The policy must be one of: {}.".format(
+                ", ".join(CACHE_POLICIES)))
+            return
+        self.settings["CACHE_POLICY"] = policy
+        self.audio_cache.policy = policy
+        await self.bot.say("Cache policy set to {}.".format(policy))
+        self.save_settings()
 
     @audioset.command(name="maxlength")
     @checks.is_owner()
@@ -930,6 +1236,28 @@ class Audio:
         await self.bot.say("Currently playing music in {} servers.".format(
             count))
 
+    @audiostat.command(name="latency")
+    async def audiostat_latency(self):
+        """Time from the play command to the start of the audio."""
+        latencies = sorted(self.play_latencies)
+        if not latencies:
+            await self.bot.say("Nothing was played yet.")
+            return
+        await self.bot.say("Last {} plays: median {:.0f}ms, max {:.0f}ms."
+                           "".format(len(latencies),
+                                     latencies[len(latencies) // 2] * 1000,
+                                     latencies[-1] * 1000))
+
+    @audiostat.command(name="metadata")
+    async def audiostat_metadata(self):
+        """Song info lookups answered without youtube_dl."""
+        info = self.song_info
+        lookups = info.hits + info.misses
+        rate = info.hits / lookups * 100 if lookups else 0
+        await self.bot.say("{} songs known. {} hits, {} misses ({:.1f}% hit "
+                           "rate).".format(len(info), info.hits, info.misses,
+                                           rate))
+
     @commands.group(pass_context=True)
     async def cache(self, ctx):
         """Cache management tools."""
@@ -1112,6 +1440,7 @@ class Audio:
         self._stop_player(server)
         self._clear_queue(server)
         self._add_to_queue(server, url)
+        self.play_requests[server.id] = time.perf_counter()
 
     @commands.command(pass_context=True, no_pm=True)
     async def prev(self, ctx):
@@ -1471,7 +1800,7 @@ class Audio:
                 # Our cache is too big, dumping
                 log.debug("cache too large ({} > {}), dumping".format(
                     self._cache_size(), self._cache_max()))
-                self._dump_cache()
+                self._dump_cache(self._cache_max())
             await asyncio.sleep(5)  # No need to run this every half second
 
     async def cache_scheduler(self):
@@ -1589,48 +1918,80 @@ class Audio:
             # We're playing but we might be able to download a new song
             curr_dl = self.downloaders.get(server.id)
             if len(temp_queue) > 0:
-                next_dl = Downloader(temp_queue.peekleft(),
-                                     max_length)
+                next_dl = self.downloads.submit(temp_queue.peekleft(),
+                                                max_length, sid=server.id)
             elif len(queue) > 0:
-                next_dl = Downloader(queue.peekleft(), max_length)
+                next_dl = self.downloads.submit(queue.peekleft(), max_length,
+                                                sid=server.id)
             else:
                 next_dl = None
 
             if next_dl is not None:
                 # Download next song
-                next_dl.start()
                 await self._download_next(server, curr_dl, next_dl)
 
-    async def queue_scheduler(self):
-        while self == self.bot.get_cog('Audio'):
-            tasks = []
-            queue = copy.deepcopy(self.queue)
-            for sid in queue:
-                if len(queue[sid]["QUEUE"]) == 0 and \
-                        len(queue[sid]["TEMP_QUEUE"]) == 0:
-                    continue
-                # log.debug("scheduler found a non-empty queue"
-                #           " for sid: {}".format(sid))
-                tasks.append(
-                    self.bot.loop.create_task(self.queue_manager(sid)))
-            completed = [t.done() for t in tasks]
-            while not all(completed):
-                completed = [t.done() for t in tasks]
-                await asyncio.sleep(0.5)
-            await asyncio.sleep(1)
-
-    async def reload_monitor(self):
-        while self == self.bot.get_cog('Audio'):
-            await asyncio.sleep(0.5)
+    def _wake_player(self, sid):
+        """Signals the player of a server that its queue changed or its
+        song ended, starting it if needed
 
+        Finished player tasks are left in self.players and replaced here."""
+        if self != self.bot.get_cog('Audio'):
+            return
+        if sid not in self.player_events:
+            self.player_events[sid] = asyncio.Event()
+        self.player_events[sid].set()
+        if sid not in self.players or self.players[sid].done():
+            self.players[sid] = self.bot.loop.create_task(
+                self.player_loop(sid))
+
+    def _queue_length(self, sid):
+        if sid not in self.queue:
+            return 0
+        return len(self.queue[sid]["QUEUE"]) + \
+            len(self.queue[sid]["TEMP_QUEUE"])
+
+    async def player_loop(self, sid):
+        """Plays the queue of a server
+
+        Sleeps until the queue changes or the current song ends, and stops
+        once there's nothing left to play."""
+        event = self.player_events[sid]
+        while self == self.bot.get_cog('Audio'):
+            event.clear()
+            server = self.bot.get_server(sid)
+            if server is None or sid not in self.queue:
+                return
+            if self._queue_length(sid) == 0:
+                if not self.is_playing(server):
+                    return
+                await event.wait()
+                continue
+            playing = self.is_playing(server)
+            try:
+                await self.queue_manager(sid)
+                if not playing and self.is_playing(server) and \
+                        self._queue_length(sid) > 0:
+                    await self.queue_manager(sid)  # Prefetch the next one
+            except Exception as e:
+                log.exception(e)
+                await asyncio.sleep(1)  # Don't spin on a broken server
+                continue
+            if not self.is_playing(server):
+                continue  # Nothing started, move on to the next song
+            await event.wait()
+
+    def __unload(self):
+        for task in self.players.values():
+            task.cancel()
         for vc in self.bot.voice_clients:
             try:
                 vc.audio_player.stop()
             except:
                 pass
+        self.downloads.shutdown()
 
     def save_settings(self):
-        fileIO('data/audio/settings.json', 'save', self.settings)
+        dataIO.save('data/audio/settings.json', self.settings)
 
     def set_server_setting(self, server, key, value):
         if server.id not in self.settings["SERVERS"]:
@@ -1685,10 +2046,10 @@ def check_files():
     default = {"VOLUME": 50, "MAX_LENGTH": 3700, "QUEUE_MODE": True,
                "MAX_CACHE": 0, "SOUNDCLOUD_CLIENT_ID": None,
                "TITLE_STATUS": True, "AVCONV": False, "VOTE_THRESHOLD": 50,
-               "SERVERS": {}}
+               "DOWNLOAD_WORKERS": 4, "CACHE_POLICY": "lru", "SERVERS": {}}
     settings_path = "data/audio/settings.json"
 
-    if not os.path.isfile(settings_path):
+    if not fileIO(settings_path, "check"):
         print("Creating default audio settings.json...")
         fileIO(settings_path, "save", default)
     else:  # consistency check
@@ -1727,7 +2088,5 @@ def setup(bot):
     n = Audio(bot)  # Praise 26
     bot.add_cog(n)
     bot.add_listener(n.voice_state_update, 'on_voice_state_update')
-    bot.loop.create_task(n.queue_scheduler())
     bot.loop.create_task(n.disconnect_timer())
-    bot.loop.create_task(n.reload_monitor())
     bot.loop.create_task(n.cache_scheduler())
@@ -1,8 +1,8 @@
 import discord
 from discord.ext import commands
-from .utils.dataIO import fileIO
+from .utils.dataIO import fileIO, dataIO
 from .utils import checks
-from __main__ import user_allowed, send_cmd_help
+from __main__ import send_cmd_help, message_pipeline, get_prefix
 import os
 
 class CustomCommands:
@@ -31,7 +31,8 @@ class CustomCommands:
         if command not in cmdlist:
             cmdlist[command] = text
             self.c_commands[server.id] = cmdlist
-            fileIO("data/customcom/commands.json", "save", self.c_commands)
+            dataIO.save("data/customcom/commands.json", self.c_commands,
+                        keys=[server.id])
             await self.bot.say("Custom command successfully added.")
         else:
             await self.bot.say("This command already exists. Use editcom to edit it.")
@@ -51,7 +52,8 @@ class CustomCommands:
             if command in cmdlist:
                 cmdlist[command] = text
                 self.c_commands[server.id] = cmdlist
-                fileIO("data/customcom/commands.json", "save", self.c_commands)
+                dataIO.save("data/customcom/commands.json", self.c_commands,
+                            keys=[server.id])
                 await self.bot.say("Custom command successfully edited.")
             else:
                 await self.bot.say("That command doesn't exist. Use addcom [command] [text]")
@@ -72,7 +74,8 @@ class CustomCommands:
             if command in cmdlist:
                 cmdlist.pop(command, None)
                 self.c_commands[server.id] = cmdlist
-                fileIO("data/customcom/commands.json", "save", self.c_commands)
+                dataIO.save("data/customcom/commands.json", self.c_commands,
+                            keys=[server.id])
                 await self.bot.say("Custom command successfully deleted.")
             else:
                 await self.bot.say("That command doesn't exist.")
@@ -103,30 +106,26 @@ class CustomCommands:
         else:
             await self.bot.say("There are no custom commands in this server. Use addcom [command] [text]")
 
-    async def checkCC(self, message):
-        if message.author.id == self.bot.user.id or len(message.content) < 2 or message.channel.is_private:
-            return
-
-        if not user_allowed(message):
+    async def checkCC(self, ctx):
+        message = ctx.message
+        if ctx.own or len(message.content) < 2 or ctx.private:
             return
 
         msg = message.content
-        server = message.server
-        prefix = self.get_prefix(msg)
+        server = ctx.server
+        prefix = ctx.prefix
 
         if prefix and server.id in self.c_commands.keys():
             cmdlist = self.c_commands[server.id]
             cmd = msg[len(prefix):]
-            if cmd in cmdlist.keys():
+            if cmd not in cmdlist.keys():
+                cmd = cmd.lower()
+            if cmd in cmdlist.keys() and ctx.allowed:
                 await self.bot.send_message(message.channel, cmdlist[cmd])
-            elif cmd.lower() in cmdlist.keys():
-                await self.bot.send_message(message.channel, cmdlist[cmd.lower()])
+                return True
 
     def get_prefix(self, msg):
-        for p in self.bot.command_prefix:
-            if msg.startswith(p):
-                return p
-        return False
+        return get_prefix(msg)
 
 def check_folders():
     if not os.path.exists("data/customcom"):
@@ -143,5 +142,5 @@ def setup(bot):
     check_folders()
     check_files()
     n = CustomCommands(bot)
-    bot.add_listener(n.checkCC, "on_message")
+    message_pipeline.register(n.checkCC, message_pipeline.ALIASES)
     bot.add_cog(n)
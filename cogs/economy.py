@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from .utils.dataIO import fileIO
+from .utils.dataIO import fileIO, dataIO, JournaledDocument
 from random import randint
 from copy import deepcopy
 from .utils import checks
@@ -26,7 +26,7 @@ class Economy:
 
     def __init__(self, bot):
         self.bot = bot
-        self.bank = fileIO("data/economy/bank.json", "load")
+        self.bank = JournaledDocument("data/economy/bank.json")
         self.settings = fileIO("data/economy/settings.json", "load")
         self.payday_register = {}
         self.slot_register = {}
@@ -43,7 +43,6 @@ class Economy:
         user = ctx.message.author
         if user.id not in self.bank:
             self.bank[user.id] = {"name" : user.name, "balance" : 100}
-            fileIO("data/economy/bank.json", "save", self.bank)
             await self.bot.say("{} Account opened. Current balance: {}".format(user.mention, str(self.check_balance(user.id))))
         else:
             await self.bot.say("{} You already have an account at the Twentysix bank.".format(user.mention))
@@ -236,35 +235,35 @@ class Economy:
         """Minimum slot machine bid"""
         self.settings["SLOT_MIN"] = bid
         await self.bot.say("Minimum bid is now " + str(bid) + " credits.")
-        fileIO("data/economy/settings.json", "save", self.settings)
+        dataIO.save("data/economy/settings.json", self.settings)
 
     @economyset.command()
     async def slotmax(self, bid : int):
         """Maximum slot machine bid"""
         self.settings["SLOT_MAX"] = bid
         await self.bot.say("Maximum bid is now " + str(bid) + " credits.")
-        fileIO("data/economy/settings.json", "save", self.settings)
+        dataIO.save("data/economy/settings.json", self.settings)
         
     @economyset.command()
     async def slottime(self, seconds : int):
         """Seconds between each slots use"""
         self.settings["SLOT_TIME"] = seconds
         await self.bot.say("Cooldown is now " + str(seconds) + " seconds.")
-        fileIO("data/economy/settings.json", "save", self.settings)
+        dataIO.save("data/economy/settings.json", self.settings)
 
     @economyset.command()
     async def paydaytime(self, seconds : int):
         """Seconds between each payday"""
         self.settings["PAYDAY_TIME"] = seconds
         await self.bot.say("Value modified. At least " + str(seconds) + " seconds must pass between each payday.")
-        fileIO("data/economy/settings.json", "save", self.settings)
+        dataIO.save("data/economy/settings.json", self.settings)
 
     @economyset.command()
     async def paydaycredits(self, credits : int):
         """Credits earned each payday"""
         self.settings["PAYDAY_CREDITS"] = credits
         await self.bot.say("Every payday will now give " + str(credits) + " credits.")
-        fileIO("data/economy/settings.json", "save", self.settings)
+        dataIO.save("data/economy/settings.json", self.settings)
 
     def account_check(self, id):
         if id in self.bank:
@@ -280,16 +279,14 @@ class Economy:
 
     def add_money(self, id, amount):
         if self.account_check(id):
-            self.bank[id]["balance"] = self.bank[id]["balance"] + int(amount)
-            fileIO("data/economy/bank.json", "save", self.bank)
+            self.bank.incr(id, "balance", int(amount))
         else:
             return False
 
     def withdraw_money(self, id, amount):
         if self.account_check(id):
             if self.bank[id]["balance"] >= int(amount):
-                self.bank[id]["balance"] = self.bank[id]["balance"] - int(amount)
-                fileIO("data/economy/bank.json", "save", self.bank)
+                self.bank.incr(id, "balance", -int(amount))
             else:
                 return False
         else:
@@ -306,12 +303,14 @@ class Economy:
 
     def set_money(self, id, amount):
         if self.account_check(id):
-            self.bank[id]["balance"] = amount
-            fileIO("data/economy/bank.json", "save", self.bank)
+            self.bank.set_field(id, "balance", amount)
             return True
         else:
             return False
 
+    def __unload(self):
+        self.bank.close()
+
     def display_time(self, seconds, granularity=2): # What would I ever do without stackoverflow?
         intervals = (                               # Source: http://stackoverflow.com/a/24542445
             ('weeks', 604800),  # 60 * 60 * 24 * 7
@@ -362,6 +361,7 @@ def setup(bot):
     global logger
     check_folders()
     check_files()
+    dataIO.configure("data/economy/bank.json", backups=3, fmt="compact")
     logger = logging.getLogger("economy")
     if logger.level == 0: # Prevents the logger from being loaded again in case of module reload
         logger.setLevel(logging.INFO)
@@ -6,6 +6,7 @@ import datetime
 import time
 import aiohttp
 import asyncio
+from __main__ import message_pipeline
 
 settings = {"POLL_DURATION" : 60}
 
@@ -261,10 +262,11 @@ class General:
                 return poll
         return False
 
-    async def check_poll_votes(self, message):
-        if message.author.id != self.bot.user.id:
-            if self.getPollByChannel(message):
-                    self.getPollByChannel(message).checkAnswer(message)
+    async def check_poll_votes(self, ctx):
+        if not ctx.own and self.poll_sessions:
+            poll = self.getPollByChannel(ctx.message)
+            if poll:
+                poll.checkAnswer(ctx.message)
 
 
 class NewPoll():
@@ -322,5 +324,5 @@ class NewPoll():
 
 def setup(bot):
     n = General(bot)
-    bot.add_listener(n.check_poll_votes, "on_message")
+    message_pipeline.register(n.check_poll_votes)
     bot.add_cog(n)
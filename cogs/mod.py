@@ -1,11 +1,172 @@
 import discord
 from discord.ext import commands
-from .utils.dataIO import fileIO
+from .utils.dataIO import fileIO, dataIO
+from .utils.kvstore import KVStore
+from .utils.wordfilter import WordFilter
+from .utils.antispam import SpamDetector
 from .utils import checks
-from __main__ import send_cmd_help, settings
+from __main__ import send_cmd_help, settings, message_pipeline
+from collections import OrderedDict
 import os
 import logging
 import asyncio
+import time
+import sys
+
+PAST_NAMES = "data/mod/past_names"  # .log and .idx, see utils/kvstore.py
+NAME_HISTORY_CAP = 20  # Past names kept per user, the oldest are dropped
+
+DISCORD_EPOCH = 1420070400000  # ms
+BULK_DELETE_MAX_AGE = 14 * 24 * 3600 - 60  # Two weeks, minus some leeway
+BULK_DELETE_MAX = 100
+BATCH_WINDOW = 0.25  # Time spent collecting deletions before a batch
+SINGLE_DELETE_DELAY = 0.25
+MAX_SINGLE_DELETE_DELAY = 5
+CLEANUP_MAX = 10000  # Messages deleted by one cleanup command
+CLEANUP_SCAN = 2000  # Messages searched for matches, at least the number asked
+
+
+def snowflake_time(snowflake):
+    """Unix time at which a Discord ID was created"""
+    return ((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000
+
+
+class DeletionQueue:
+    """Deletes the messages of a channel in batches
+
+    Messages younger than two weeks are removed up to 100 at a time with
+    a bulk delete. Older ones, and all of them if bulk deletion isn't
+    available, go through single deletes with a pause between them that
+    grows when Discord rate limits us."""
+
+    def __init__(self, bot, channel, bulk=True):
+        self.bot = bot
+        self.channel = channel
+        self.bulk = bulk
+        self.pending = OrderedDict()  # Message id -> message
+        self.deleted = 0
+        self.bulk_deleted = 0
+        self.elapsed = 0
+        self.delay = SINGLE_DELETE_DELAY
+        self._task = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def put(self, message):
+        self.pending[message.id] = message
+        self._idle.clear()
+        if self._task is None or self._task.done():
+            self._task = self.bot.loop.create_task(self._worker())
+
+    async def join(self):
+        """Waits until every queued message has been handled"""
+        await self._idle.wait()
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+        self.pending.clear()
+        self._idle.set()
+
+    @property
+    def rate(self):
+        """Messages deleted per second of work"""
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+    async def _worker(self):
+        started = time.perf_counter()
+        deleted = self.deleted
+        try:
+            while self.pending:
+                if len(self.pending) < BULK_DELETE_MAX:
+                    await asyncio.sleep(BATCH_WINDOW)
+                batch = []
+                while self.pending and len(batch) < BULK_DELETE_MAX:
+                    batch.append(self.pending.popitem(last=False)[1])
+                await self._delete(batch)
+        except discord.errors.Forbidden:
+            logger.warning("Missing permissions to delete messages in "
+                           "#{}, dropping {} deletions".format(
+                               self.channel.name, len(self.pending)))
+            self.pending.clear()
+        finally:
+            self.elapsed += time.perf_counter() - started
+            deleted = self.deleted - deleted
+            if deleted:
+                logger.info("Deleted {} messages in #{} in {:.2f}s "
+                            "({:.1f}/s overall, {} in bulk)".format(
+                                deleted, self.channel.name,
+                                time.perf_counter() - started, self.rate,
+                                self.bulk_deleted))
+            self._idle.set()
+
+    async def _delete(self, batch):
+        if self.bulk:
+            oldest = time.time() - BULK_DELETE_MAX_AGE
+            young = [m for m in batch if snowflake_time(m.id) > oldest]
+            if len(young) >= 2:
+                try:
+                    await self.bot.delete_messages(young)
+                except discord.errors.Forbidden:
+                    raise
+                except discord.errors.HTTPException:
+                    pass  # Falls back to single deletes
+                else:
+                    self.deleted += len(young)
+                    self.bulk_deleted += len(young)
+                    batch = [m for m in batch if m not in young]
+        for message in batch:
+            await self._delete_one(message)
+
+    async def _delete_one(self, message):
+        while True:
+            try:
+                await self.bot.delete_message(message)
+            except discord.errors.NotFound:
+                return
+            except discord.errors.Forbidden:
+                raise
+            except discord.errors.HTTPException as e:
+                if e.response.status != 429:
+                    logger.warning("Couldn't delete message {}: {}".format(
+                        message.id, e))
+                    return
+                self.delay = min(self.delay * 2, MAX_SINGLE_DELETE_DELAY)
+                await asyncio.sleep(self.delay)
+                continue
+            self.deleted += 1
+            await asyncio.sleep(self.delay)
+            self.delay = max(self.delay / 2, SINGLE_DELETE_DELAY)
+            return
+
+
+class NameHistory(KVStore):
+    """Past names of each user, at most cap of them, oldest first
+
+    Names are interned: the same name in many users' histories is held
+    in memory once."""
+
+    def __init__(self, path, cap=NAME_HISTORY_CAP, cache_size=1024):
+        self.cap = cap
+        super().__init__(path, cache_size)
+
+    def _read_value(self, offset):
+        return [sys.intern(n) for n in super()._read_value(offset)]
+
+    def _bounded(self, names):
+        names = [sys.intern(n) for n in names]
+        return names[-self.cap:]
+
+    def add(self, user_id, name):
+        """Records name as the latest one of user_id"""
+        names = [n for n in self.get(user_id, []) if n != name]
+        names.append(name)
+        self[user_id] = self._bounded(names)
+
+    def import_json(self, data):
+        """Bulk loads a {user id: [names]} dict, as in past_names.json"""
+        self.update((user_id, self._bounded(names))
+                    for user_id, names in data.items())
 
 
 class Mod:
@@ -16,8 +177,57 @@ class Mod:
         self.whitelist_list = fileIO("data/mod/whitelist.json", "load")
         self.blacklist_list = fileIO("data/mod/blacklist.json", "load")
         self.ignore_list = fileIO("data/mod/ignorelist.json", "load")
+        self.build_access_sets()
         self.filter = fileIO("data/mod/filter.json", "load")
-        self.past_names = fileIO("data/mod/past_names.json", "load")
+        self.antispam = set(fileIO("data/mod/antispam.json", "load"))
+        self.spam_detector = SpamDetector()
+        self.word_filters = {}
+        self.deletion_queues = {}
+        self.past_names = NameHistory(PAST_NAMES)
+
+    def get_deletion_queue(self, channel):
+        queue = self.deletion_queues.get(channel.id)
+        if queue is None:
+            bulk = self.bot.user.bot and self.discordpy_updated()
+            queue = DeletionQueue(self.bot, channel, bulk)
+            self.deletion_queues[channel.id] = queue
+        return queue
+
+    def get_word_filter(self, server):
+        """Returns the compiled filter of server, building it if needed"""
+        word_filter = self.word_filters.get(server.id)
+        if word_filter is None:
+            word_filter = WordFilter(self.filter.get(server.id, []))
+            self.word_filters[server.id] = word_filter
+        return word_filter
+
+    def build_access_sets(self):
+        """Rebuilds the sets used by is_message_allowed from the lists"""
+        self.blacklisted = frozenset(self.blacklist_list)
+        self.whitelisted = frozenset(self.whitelist_list)
+        self.ignored_servers = frozenset(self.ignore_list["SERVERS"])
+        self.ignored_channels = frozenset(self.ignore_list["CHANNELS"])
+
+    def is_message_allowed(self, message):
+        """Checks the author against the blacklist, whitelist and ignore
+        lists. The owner, admins and mods are always allowed."""
+        author = message.author
+        if author.id == settings.owner:
+            return True
+        private = message.channel.is_private
+        if not private and checks.resolver.is_mod(author):
+            return True
+
+        if author.id in self.blacklisted:
+            return False
+        if self.whitelisted and author.id not in self.whitelisted:
+            return False
+        if not private:
+            if message.server.id in self.ignored_servers:
+                return False
+            if message.channel.id in self.ignored_channels:
+                return False
+        return True
 
     @commands.group(pass_context=True, no_pm=True)
     @checks.serverowner_or_permissions(manage_server=True)
@@ -49,6 +259,19 @@ class Mod:
         settings.set_server_mod(server, role_name)
         await self.bot.say("Mod role set to '{}'".format(role_name))
 
+    @modset.command(name="antispam", pass_context=True, no_pm=True)
+    async def _modset_antispam(self, ctx):
+        """Toggles deletion of message floods and repeated messages"""
+        server = ctx.message.server
+        if server.id in self.antispam:
+            self.antispam.remove(server.id)
+            await self.bot.say("Anti spam disabled.")
+        else:
+            self.antispam.add(server.id)
+            await self.bot.say("Anti spam enabled. Floods and repeated "
+                               "messages will be deleted.")
+        dataIO.save("data/mod/antispam.json", sorted(self.antispam))
+
     @commands.command(no_pm=True, pass_context=True)
     @checks.admin_or_permissions(kick_members=True)
     async def kick(self, ctx, user: discord.Member):
@@ -123,51 +346,9 @@ class Mod:
             number = 1
         author = ctx.message.author
         message = ctx.message
-        channel = ctx.message.channel
         logger.info("{}({}) deleted {} messages containing '{}' in channel {}".format(author.name,
             author.id, str(number), text, message.channel.name))
-        if self.bot.user.bot and self.discordpy_updated():
-            def to_delete(m):
-                if m == ctx.message or text in m.content:
-                    return True
-                else:
-                    return False
-            try:
-                await self.bot.purge_from(channel, limit=number+1, check=to_delete)
-            except discord.errors.Forbidden:
-                await self.bot.say("I need permissions to manage messages "
-                                   "in this channel.")
-        else:
-            await self.legacy_cleanup_text_messages(ctx, text, number)
-
-
-    async def legacy_cleanup_text_messages(self, ctx, text, number):
-        message = ctx.message
-        cmdmsg = ctx.message
-        if self.bot.user.bot:
-            print("Your discord.py is outdated, defaulting to slow deletion.")
-        try:
-            if number > 0 and number < 10000:
-                while True:
-                    new = False
-                    async for x in self.bot.logs_from(message.channel, limit=100, before=message):
-                        if number == 0:
-                            await self._delete_message(cmdmsg)
-                            await asyncio.sleep(0.25)
-                            return
-                        if text in x.content:
-                            await self._delete_message(x)
-                            await asyncio.sleep(0.25)
-                            number -= 1
-                        new = True
-                        message = x
-                    if not new or number == 0:
-                        await self._delete_message(cmdmsg)
-                        await asyncio.sleep(0.25)
-                        break
-        except discord.errors.Forbidden:
-            await self.bot.send_message(message.channel, "I need permissions"
-                 " to manage messages in this channel.")
+        await self._cleanup(ctx, number, lambda m: text in m.content)
 
     @cleanup.command(pass_context=True, no_pm=True)
     async def user(self, ctx, user: discord.Member, number: int):
@@ -179,54 +360,10 @@ class Mod:
         if number < 1:
             number = 1
         author = ctx.message.author
-        channel = ctx.message.channel
         message = ctx.message
         logger.info("{}({}) deleted {} messages made by {}({}) in channel {}".format(author.name,
             author.id, str(number), user.name, user.id, message.channel.name))
-        if self.bot.user.bot and self.discordpy_updated():
-            def is_user(m):
-                if m == ctx.message or m.author == user:
-                    return True
-                else:
-                    return False
-            try:
-                await self.bot.purge_from(channel, limit=number+1, check=is_user)
-            except discord.errors.Forbidden:
-                await self.bot.say("I need permissions to manage messages "
-                                   "in this channel.")
-        else:
-            await self.legacy_cleanup_user_messages(ctx, user, number)
-
-
-    async def legacy_cleanup_user_messages(self, ctx, user, number):
-        author = ctx.message.author
-        message = ctx.message
-        cmdmsg = ctx.message
-        if self.bot.user.bot:
-            print("Your discord.py is outdated, defaulting to slow deletion.")
-        try:
-            if number > 0 and number < 10000:
-                while True:
-                    new = False
-                    async for x in self.bot.logs_from(message.channel, limit=100, before=message):
-                        if number == 0:
-                            await self._delete_message(cmdmsg)
-                            await asyncio.sleep(0.25)
-                            return
-                        if x.author.id == user.id:
-                            await self._delete_message(x)
-                            await asyncio.sleep(0.25)
-                            number -= 1
-                        new = True
-                        message = x
-                    if not new or number == 0:
-                        await self._delete_message(cmdmsg)
-                        await asyncio.sleep(0.25)
-                        break
-        except discord.errors.Forbidden:
-            await self.bot.send_message(ctx.channel, "I need permissions "
-                            "to manage messages in this channel.")
-
+        await self._cleanup(ctx, number, lambda m: m.author.id == user.id)
 
     @cleanup.command(pass_context=True, no_pm=True)
     async def messages(self, ctx, number: int):
@@ -240,26 +377,45 @@ class Mod:
         channel = ctx.message.channel
         logger.info("{}({}) deleted {} messages in channel {}".format(author.name,
             author.id, str(number), channel.name))
-        if self.bot.user.bot and self.discordpy_updated():
-            try:
-                await self.bot.purge_from(channel, limit=number+1)
-            except discord.errors.Forbidden:
-                await self.bot.say("I need permissions to manage messages in this channel.")
-        else:
-            await self.legacy_cleanup_messages(ctx, number)
+        await self._cleanup(ctx, number)
 
-    async def legacy_cleanup_messages(self, ctx, number):
-        author = ctx.message.author
+    async def _cleanup(self, ctx, number, check=None):
+        """Queues the command message and the last number messages
+        passing check for deletion, then waits for the queue
+
+        Only the last CLEANUP_SCAN messages, or number if more, are
+        searched."""
         channel = ctx.message.channel
-        if self.bot.user.bot:
-                print("Your discord.py is outdated, defaulting to slow deletion.")
+        if not channel.permissions_for(channel.server.me).manage_messages:
+            await self.bot.say("I need permissions to manage messages "
+                               "in this channel.")
+            return
+        queue = self.get_deletion_queue(channel)
+        if self.bot.user.bot and not queue.bulk:
+            print("Your discord.py is outdated, defaulting to slow deletion.")
+        queue.put(ctx.message)
+        before = ctx.message
+        number = min(number, CLEANUP_MAX)
+        scan = max(number, CLEANUP_SCAN)
         try:
-            if number > 0 and number < 10000:
-                async for x in self.bot.logs_from(channel, limit=number + 1):
-                    await self._delete_message(x)
-                    await asyncio.sleep(0.25)
+            while number > 0 and scan > 0:
+                new = False
+                async for m in self.bot.logs_from(channel, limit=min(100, scan),
+                                                  before=before):
+                    new = True
+                    before = m
+                    scan -= 1
+                    if check is None or check(m):
+                        queue.put(m)
+                        number -= 1
+                        if number == 0:
+                            break
+                if not new:
+                    break
         except discord.errors.Forbidden:
-            await self.bot.send_message(channel, "I need permissions to manage messages in this channel.")
+            await self.bot.say("I need permissions to read the message "
+                               "history of this channel.")
+        await queue.join()
 
     @commands.group(pass_context=True)
     @checks.is_owner()
@@ -271,9 +427,10 @@ class Mod:
     @blacklist.command(name="add")
     async def _blacklist_add(self, user: discord.Member):
         """Adds user to bot's blacklist"""
-        if user.id not in self.blacklist_list:
+        if user.id not in self.blacklisted:
             self.blacklist_list.append(user.id)
-            fileIO("data/mod/blacklist.json", "save", self.blacklist_list)
+            dataIO.save("data/mod/blacklist.json", self.blacklist_list)
+            self.build_access_sets()
             await self.bot.say("User has been added to blacklist.")
         else:
             await self.bot.say("User is already blacklisted.")
@@ -281,9 +438,10 @@ class Mod:
     @blacklist.command(name="remove")
     async def _blacklist_remove(self, user: discord.Member):
         """Removes user to bot's blacklist"""
-        if user.id in self.blacklist_list:
+        if user.id in self.blacklisted:
             self.blacklist_list.remove(user.id)
-            fileIO("data/mod/blacklist.json", "save", self.blacklist_list)
+            dataIO.save("data/mod/blacklist.json", self.blacklist_list)
+            self.build_access_sets()
             await self.bot.say("User has been removed from blacklist.")
         else:
             await self.bot.say("User is not in blacklist.")
@@ -298,13 +456,14 @@ class Mod:
     @whitelist.command(name="add")
     async def _whitelist_add(self, user: discord.Member):
         """Adds user to bot's whitelist"""
-        if user.id not in self.whitelist_list:
+        if user.id not in self.whitelisted:
             if not self.whitelist_list:
                 msg = "\nAll users not in whitelist will be ignored (owner, admins and mods excluded)"
             else:
                 msg = ""
             self.whitelist_list.append(user.id)
-            fileIO("data/mod/whitelist.json", "save", self.whitelist_list)
+            dataIO.save("data/mod/whitelist.json", self.whitelist_list)
+            self.build_access_sets()
             await self.bot.say("User has been added to whitelist." + msg)
         else:
             await self.bot.say("User is already whitelisted.")
@@ -312,9 +471,10 @@ class Mod:
     @whitelist.command(name="remove")
     async def _whitelist_remove(self, user: discord.Member):
         """Removes user to bot's whitelist"""
-        if user.id in self.whitelist_list:
+        if user.id in self.whitelisted:
             self.whitelist_list.remove(user.id)
-            fileIO("data/mod/whitelist.json", "save", self.whitelist_list)
+            dataIO.save("data/mod/whitelist.json", self.whitelist_list)
+            self.build_access_sets()
             await self.bot.say("User has been removed from whitelist.")
         else:
             await self.bot.say("User is not in whitelist.")
@@ -334,16 +494,18 @@ class Mod:
         Defaults to current one"""
         current_ch = ctx.message.channel
         if not channel:
-            if current_ch.id not in self.ignore_list["CHANNELS"]:
+            if current_ch.id not in self.ignored_channels:
                 self.ignore_list["CHANNELS"].append(current_ch.id)
-                fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+                dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+                self.build_access_sets()
                 await self.bot.say("Channel added to ignore list.")
             else:
                 await self.bot.say("Channel already in ignore list.")
         else:
-            if channel.id not in self.ignore_list["CHANNELS"]:
+            if channel.id not in self.ignored_channels:
                 self.ignore_list["CHANNELS"].append(channel.id)
-                fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+                dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+                self.build_access_sets()
                 await self.bot.say("Channel added to ignore list.")
             else:
                 await self.bot.say("Channel already in ignore list.")
@@ -352,9 +514,10 @@ class Mod:
     async def ignore_server(self, ctx):
         """Ignores current server"""
         server = ctx.message.server
-        if server.id not in self.ignore_list["SERVERS"]:
+        if server.id not in self.ignored_servers:
             self.ignore_list["SERVERS"].append(server.id)
-            fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+            dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+            self.build_access_sets()
             await self.bot.say("This server has been added to the ignore list.")
         else:
             await self.bot.say("This server is already being ignored.")
@@ -374,16 +537,18 @@ class Mod:
         Defaults to current one"""
         current_ch = ctx.message.channel
         if not channel:
-            if current_ch.id in self.ignore_list["CHANNELS"]:
+            if current_ch.id in self.ignored_channels:
                 self.ignore_list["CHANNELS"].remove(current_ch.id)
-                fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+                dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+                self.build_access_sets()
                 await self.bot.say("This channel has been removed from the ignore list.")
             else:
                 await self.bot.say("This channel is not in the ignore list.")
         else:
-            if channel.id in self.ignore_list["CHANNELS"]:
+            if channel.id in self.ignored_channels:
                 self.ignore_list["CHANNELS"].remove(channel.id)
-                fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+                dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+                self.build_access_sets()
                 await self.bot.say("Channel removed from ignore list.")
             else:
                 await self.bot.say("That channel is not in the ignore list.")
@@ -392,9 +557,10 @@ class Mod:
     async def unignore_server(self, ctx):
         """Removes current server from ignore list"""
         server = ctx.message.server
-        if server.id in self.ignore_list["SERVERS"]:
+        if server.id in self.ignored_servers:
             self.ignore_list["SERVERS"].remove(server.id)
-            fileIO("data/mod/ignorelist.json", "save", self.ignore_list)
+            dataIO.save("data/mod/ignorelist.json", self.ignore_list)
+            self.build_access_sets()
             await self.bot.say("This server has been removed from the ignore list.")
         else:
             await self.bot.say("This server is not in the ignore list.")
@@ -445,7 +611,9 @@ class Mod:
                 self.filter[server.id].append(w.lower())
                 added += 1
         if added:
-            fileIO("data/mod/filter.json", "save", self.filter)
+            dataIO.save("data/mod/filter.json", self.filter, keys=[server.id])
+            self.word_filters.pop(server.id, None)
+            self.get_word_filter(server)
             await self.bot.say("Words added to filter.")
         else:
             await self.bot.say("Words already in the filter.")
@@ -471,7 +639,9 @@ class Mod:
                 self.filter[server.id].remove(w.lower())
                 removed += 1
         if removed:
-            fileIO("data/mod/filter.json", "save", self.filter)
+            dataIO.save("data/mod/filter.json", self.filter, keys=[server.id])
+            self.word_filters.pop(server.id, None)
+            self.get_word_filter(server)
             await self.bot.say("Words removed from filter.")
         else:
             await self.bot.say("Those words weren't in the filter.")
@@ -533,7 +703,7 @@ class Mod:
     async def names(self, user : discord.Member):
         """Show previous names of a user"""
         exclude = ("@everyone", "@here")
-        if user.id in self.past_names.keys():
+        if user.id in self.past_names:
             names = ""
             for name in self.past_names[user.id]:
                 if not any(mnt in name.lower() for mnt in exclude):
@@ -550,59 +720,64 @@ class Mod:
             return False
         return True
 
-    async def _delete_message(self, message):
-        try:
-            await self.bot.delete_message(message)
-        except discord.errors.NotFound:
-            pass
-        except:
-            raise
-
     def immune_from_filter(self, message):
         user = message.author
-        server = message.server
-        admin_role = settings.get_server_admin(server)
-        mod_role = settings.get_server_mod(server)
 
         if user.id == settings.owner:
             return True
-        elif discord.utils.get(user.roles, name=admin_role):
-            return True
-        elif discord.utils.get(user.roles, name=mod_role):
+        elif checks.resolver.is_mod(user):
             return True
         else:
             return False
 
-    async def check_filter(self, message):
-        if message.channel.is_private:
+    async def check_filter(self, ctx):
+        if ctx.private or ctx.own:
             return
-        server = message.server
-        can_delete = message.channel.permissions_for(server.me).manage_messages
+        message = ctx.message
+        server = ctx.server
+        if not self.filter.get(server.id):
+            return
+        w = self.get_word_filter(server).search(ctx.normalized,
+                                                normalized=True)
+        if w is None:
+            return
+        can_delete = ctx.channel.permissions_for(server.me).manage_messages
 
-        if (message.author.id == self.bot.user.id or 
-        self.immune_from_filter(message) or not can_delete): # Owner, admins and mods are immune to the filter
+        if self.immune_from_filter(message) or not can_delete: # Owner, admins and mods are immune to the filter
             return
 
-        if server.id in self.filter.keys():
-            for w in self.filter[server.id]:
-                if w in message.content.lower():
-                    # Something else in discord.py is throwing a 404 error
-                    # after deletion
-                    try:
-                        await self._delete_message(message)
-                    except:
-                        pass
-                    print("Message deleted. Filtered: " + w)
+        self.get_deletion_queue(ctx.channel).put(message)
+        print("Message deleted. Filtered: " + w)
+        return True
 
 
+    async def check_spam(self, ctx):
+        if ctx.private or ctx.own or ctx.server.id not in self.antispam:
+            return
+        message = ctx.message
+        reason = self.spam_detector.check(message, text=ctx.normalized)
+        if reason is None:
+            return
+        server = ctx.server
+        can_delete = ctx.channel.permissions_for(server.me).manage_messages
+
+        if self.immune_from_filter(message) or not can_delete:
+            return
+
+        self.get_deletion_queue(ctx.channel).put(message)
+        logger.debug("Deleting {} from {}({}) in #{} ({})".format(
+            reason, message.author.name, message.author.id,
+            ctx.channel.name, server.name))
+        return True
+
     async def check_names(self, before, after):
         if before.name != after.name:
-            if before.id not in self.past_names.keys():
-                self.past_names[before.id] = [before.name]
-            else:
-                if before.name not in self.past_names[before.id]:
-                    self.past_names[before.id].append(before.name)
-            fileIO("data/mod/past_names.json", "save", self.past_names)
+            self.past_names.add(before.id, before.name)
+
+    def __unload(self):
+        for queue in self.deletion_queues.values():
+            queue.cancel()
+        self.past_names.close()
 
 def check_folders():
     folders = ("data", "data/mod/")
@@ -615,25 +790,35 @@ def check_folders():
 def check_files():
     ignore_list = {"SERVERS": [], "CHANNELS": []}
 
-    if not os.path.isfile("data/mod/blacklist.json"):
+    if not fileIO("data/mod/blacklist.json", "check"):
         print("Creating empty blacklist.json...")
         fileIO("data/mod/blacklist.json", "save", [])
 
-    if not os.path.isfile("data/mod/whitelist.json"):
+    if not fileIO("data/mod/whitelist.json", "check"):
         print("Creating empty whitelist.json...")
         fileIO("data/mod/whitelist.json", "save", [])
 
-    if not os.path.isfile("data/mod/ignorelist.json"):
+    if not fileIO("data/mod/ignorelist.json", "check"):
         print("Creating empty ignorelist.json...")
         fileIO("data/mod/ignorelist.json", "save", ignore_list)
 
-    if not os.path.isfile("data/mod/filter.json"):
+    if not fileIO("data/mod/filter.json", "check"):
         print("Creating empty filter.json...")
         fileIO("data/mod/filter.json", "save", {})
 
-    if not os.path.isfile("data/mod/past_names.json"):
-        print("Creating empty past_names.json...")
-        fileIO("data/mod/past_names.json", "save", {})
+    if not fileIO("data/mod/antispam.json", "check"):
+        print("Creating empty antispam.json...")
+        fileIO("data/mod/antispam.json", "save", [])
+
+    f = "data/mod/past_names.json"
+    if not os.path.isfile(PAST_NAMES + ".log") and fileIO(f, "check"):
+        print("Moving past_names.json to the name store...")
+        past_names = NameHistory(PAST_NAMES)
+        past_names.import_json(fileIO(f, "load"))
+        past_names.close()
+        dataIO.sqlite.drop(f)
+        if os.path.isfile(f):
+            os.replace(f, f + ".imported")
 
 
 
@@ -651,6 +836,8 @@ def setup(bot):
             logging.Formatter('%(asctime)s %(message)s', datefmt="[%d/%m/%Y %H:%M]"))
         logger.addHandler(handler)
     n = Mod(bot)
-    bot.add_listener(n.check_filter, "on_message")
+    # Before the word filter, so filtered messages still count as traffic
+    message_pipeline.register(n.check_spam, message_pipeline.FILTER)
+    message_pipeline.register(n.check_filter, message_pipeline.FILTER)
     bot.add_listener(n.check_names, "on_member_update")
     bot.add_cog(n)
\ No newline at end of file
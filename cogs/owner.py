@@ -1,16 +1,18 @@
 import discord
 from discord.ext import commands
 from cogs.utils import checks
-from __main__ import set_cog, send_cmd_help, settings
-from .utils.dataIO import fileIO
+from __main__ import set_cog, send_cmd_help, settings, message_pipeline
+from __main__ import set_prefixes, get_cog, cog_manifest, remove_lazy_cog
+from .utils.dataIO import fileIO, dataIO
+from .utils.backup import Snapshot, backup_path
 
 import importlib
+import sys
 import traceback
 import logging
 import asyncio
 import threading
 import datetime
-import glob
 import os
 import time
 
@@ -102,12 +104,41 @@ class Owner:
         else:
             await self.bot.say("Module disabled.")
 
+    @commands.command()
+    @checks.is_owner()
+    async def lazy(self, *, module: str):
+        """Toggles loading a module on first use of its commands
+
+        Takes effect at the next start. Until one of its commands is used
+        the module doesn't run its listeners or background tasks, so this
+        is meant for modules like audio or image.
+
+        Example: lazy audio"""
+        module = module.strip()
+        if "cogs." not in module:
+            module = "cogs." + module
+        if module == "cogs.owner" or not self._does_cogfile_exist(module):
+            await self.bot.say("That module cannot be loaded lazily.")
+            return
+        if get_cog(module) == "lazy":
+            set_cog(module, True)
+            await self.bot.say("The module will be loaded at start.")
+        else:
+            set_cog(module, "lazy")
+            await self.bot.say("The module will be loaded on first use.")
+
     @checks.is_owner()
     @commands.command(name="reload")
     async def _reload(self, module):
         """Reloads a module
 
+        "reload changed" reloads every loaded module whose source
+        changed since it was loaded.
+
         Example: reload audio"""
+        if module == "changed":
+            await self.reload_changed()
+            return
         if "cogs." not in module:
             module = "cogs." + module
 
@@ -128,10 +159,33 @@ class Owner:
             await self.bot.say("That module could not be loaded. Check your"
                                " logs for more information.")
         else:
-            set_cog(module, True)
+            if get_cog(module) != "lazy":
+                set_cog(module, True)
             await self.disable_commands()
             await self.bot.say("Module reloaded.")
 
+    async def reload_changed(self):
+        changed = [e for e in self._list_cogs() if e in self.bot.extensions
+                   and e != "cogs.owner" and cog_manifest.changed(e)]
+        if not changed:
+            await self.bot.say("No loaded module changed.")
+            return
+        failed = []
+        for module in changed:
+            try:
+                self._unload_cog(module, reloading=True)
+                self._load_cog(module)
+            except Exception as e:
+                log.exception(e)
+                failed.append(module)
+        await self.disable_commands()
+        msg = "Reloaded: " + ", ".join(m[5:] for m in changed
+                                        if m not in failed)
+        if failed:
+            msg += "\nFailed, check your logs: " + ", ".join(
+                m[5:] for m in failed)
+        await self.bot.say(msg)
+
     @commands.command(pass_context=True, hidden=True)
     @checks.is_owner()
     async def debug(self, ctx, *, code):
@@ -200,7 +254,7 @@ class Owner:
             await self.bot.say("Example: setprefix [ ! ^ .")
             return
 
-        self.bot.command_prefix = sorted(prefixes, reverse=True)
+        set_prefixes(sorted(prefixes, reverse=True))
         settings.prefixes = sorted(prefixes, reverse=True)
         log.debug("Setting prefixes to:\n\t{}".format(settings.prefixes))
 
@@ -446,6 +500,38 @@ class Owner:
         else:
             await self.bot.say("Alright then.")
 
+    @commands.command()
+    @checks.is_owner()
+    async def datastats(self):
+        """Shows pending writes and flush latency of the data store"""
+        msg = "```"
+        for k, v in sorted(dataIO.stats().items()):
+            msg += str(k) + ": " + str(v) + "\n"
+        msg += "```"
+        await self.bot.say(msg)
+
+    @commands.command()
+    @checks.is_owner()
+    async def backup(self):
+        """Saves a compressed copy of all the data to the backups folder
+
+        Restore it with backup.py while Red is offline."""
+        path = backup_path()
+        snapshot = Snapshot()
+        try:
+            await self.bot.loop.run_in_executor(None, dataIO.sync)
+            snapshot.take(sync=False)
+            manifest = await self.bot.loop.run_in_executor(
+                None, snapshot.write, path)
+        except Exception as e:
+            log.exception(e)
+            await self.bot.say("Backup failed: {}".format(e))
+            return
+        finally:
+            snapshot.close()
+        await self.bot.say("Backed up {} files to `{}` ({} KB)".format(
+            len(manifest["FILES"]), path, os.path.getsize(path) // 1024))
+
     @commands.command()
     async def uptime(self):
         """Shows Red's uptime"""
@@ -464,9 +550,14 @@ class Owner:
         if not self._does_cogfile_exist(cogname):
             raise CogNotFoundError(cogname)
         try:
-            mod_obj = importlib.import_module(cogname)
-            importlib.reload(mod_obj)
+            # Only reload modules imported before, importing runs it already
+            if cogname in sys.modules:
+                mod_obj = importlib.reload(sys.modules[cogname])
+            else:
+                mod_obj = importlib.import_module(cogname)
+            remove_lazy_cog(cogname)
             self.bot.load_extension(mod_obj.__name__)
+            cog_manifest.record_load(cogname, self.bot)
         except SyntaxError as e:
             raise CogLoadError(*e.args)
         except:
@@ -480,21 +571,16 @@ class Owner:
             self.bot.unload_extension(cogname)
         except:
             raise CogUnloadError
+        remove_lazy_cog(cogname)
+        message_pipeline.unregister_module(cogname)
 
     def _list_cogs(self):
-        cogs = glob.glob("cogs/*.py")
-        clean = []
-        for c in cogs:
-            c = c.replace("/", "\\")  # Linux fix
-            clean.append("cogs." + c.split("\\")[1].replace(".py", ""))
-        return clean
+        return cog_manifest.list()
 
     def _does_cogfile_exist(self, module):
         if "cogs." not in module:
             module = "cogs." + module
-        if module not in self._list_cogs():
-            return False
-        return True
+        return cog_manifest.exists(module)
 
     def _wait_for_answer(self, author):
         print(author.name + " requested to be set as owner. If this is you, "
@@ -523,7 +609,7 @@ class Owner:
             *version)
 
 def check_files():
-    if not os.path.isfile("data/red/disabled_commands.json"):
+    if not fileIO("data/red/disabled_commands.json", "check"):
         print("Creating empty disabled_commands.json...")
         fileIO("data/red/disabled_commands.json", "save", [])
 
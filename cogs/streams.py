@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from .utils.dataIO import fileIO
+from .utils.dataIO import fileIO, dataIO
 from .utils import checks
 import os
 import time
@@ -110,7 +110,7 @@ class Streams:
             await self.bot.say("Alert activated. I will notify this channel "
                                "everytime {} is live.".format(stream))
 
-        fileIO("data/streams/twitch.json", "save", self.twitch_streams)
+        dataIO.save("data/streams/twitch.json", self.twitch_streams)
 
     @streamalert.command(name="hitbox", pass_context=True)
     async def hitbox_alert(self, ctx, stream: str):
@@ -153,7 +153,7 @@ class Streams:
             await self.bot.say("Alert activated. I will notify this channel "
                                "everytime {} is live.".format(stream))
 
-        fileIO("data/streams/hitbox.json", "save", self.hitbox_streams)
+        dataIO.save("data/streams/hitbox.json", self.hitbox_streams)
 
     @streamalert.command(name="beam", pass_context=True)
     async def beam_alert(self, ctx, stream: str):
@@ -196,7 +196,7 @@ class Streams:
             await self.bot.say("Alert activated. I will notify this channel "
                                "everytime {} is live.".format(stream))
 
-        fileIO("data/streams/beam.json", "save", self.beam_streams)
+        dataIO.save("data/streams/beam.json", self.beam_streams)
 
     @streamalert.command(name="stop", pass_context=True)
     async def stop_alert(self, ctx):
@@ -239,9 +239,9 @@ class Streams:
         for s in to_delete:
             self.beam_streams.remove(s)
 
-        fileIO("data/streams/twitch.json", "save", self.twitch_streams)
-        fileIO("data/streams/hitbox.json", "save", self.hitbox_streams)
-        fileIO("data/streams/beam.json", "save", self.beam_streams)
+        dataIO.save("data/streams/twitch.json", self.twitch_streams)
+        dataIO.save("data/streams/hitbox.json", self.hitbox_streams)
+        dataIO.save("data/streams/beam.json", self.beam_streams)
 
         await self.bot.say("There will be no more stream alerts in this "
                            "channel.")
@@ -362,9 +362,9 @@ class Streams:
 
             if old != (self.twitch_streams, self.hitbox_streams,
                        self.beam_streams):
-                fileIO("data/streams/twitch.json", "save", self.twitch_streams)
-                fileIO("data/streams/hitbox.json", "save", self.hitbox_streams)
-                fileIO("data/streams/beam.json", "save", self.beam_streams)
+                dataIO.save("data/streams/twitch.json", self.twitch_streams)
+                dataIO.save("data/streams/hitbox.json", self.hitbox_streams)
+                dataIO.save("data/streams/beam.json", self.beam_streams)
 
             await asyncio.sleep(CHECK_DELAY)
 
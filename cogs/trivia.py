@@ -4,6 +4,7 @@ from random import randint
 from random import choice as randchoice
 from .utils.dataIO import fileIO
 from .utils import checks
+from __main__ import message_pipeline
 import datetime
 import time
 import os
@@ -263,11 +264,11 @@ async def get_trivia_by_channel(channel):
                 return t
         return False
 
-async def check_messages(message):
-    if message.author.id != trivia_manager.bot.user.id:
-        if await get_trivia_by_channel(message.channel):
-            trvsession = await get_trivia_by_channel(message.channel)
-            await trvsession.check_answer(message)
+async def check_messages(ctx):
+    if not ctx.own and trivia_manager.trivia_sessions:
+        trvsession = await get_trivia_by_channel(ctx.channel)
+        if trvsession:
+            await trvsession.check_answer(ctx.message)
 
 def check_folders():
     folders = ("data", "data/trivia/")
@@ -279,7 +280,7 @@ def check_folders():
 def check_files():
     settings = {"TRIVIA_MAX_SCORE" : 10, "TRIVIA_TIMEOUT" : 120,  "TRIVIA_DELAY" : 15, "TRIVIA_BOT_PLAYS" : False}
 
-    if not os.path.isfile("data/trivia/settings.json"):
+    if not fileIO("data/trivia/settings.json", "check"):
         print("Creating empty settings.json...")
         fileIO("data/trivia/settings.json", "save", settings)
 
@@ -287,6 +288,6 @@ def setup(bot):
     global trivia_manager
     check_folders()
     check_files()
-    bot.add_listener(check_messages, "on_message")
+    message_pipeline.register(check_messages)
     trivia_manager = Trivia(bot)
     bot.add_cog(trivia_manager)
@@ -0,0 +1,129 @@
+from collections import OrderedDict
+import logging
+import time
+
+from .wordfilter import normalize
+
+log = logging.getLogger("mod")
+
+# Rates in messages per second and burst sizes. A token bucket allows a
+# burst of messages at once, then refills at its rate.
+USER_RATE, USER_BURST = 1, 5
+CHANNEL_RATE, CHANNEL_BURST = 3, 15
+DUPLICATE_RATE, DUPLICATE_BURST = 0.2, 3  # Same text from the same user
+RAID_DURATION = 60  # Raid mode halves the user and duplicate bursts
+MAX_TRACKED = 200000  # Buckets kept per table, least recently used go first
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "stamp")
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now, rate, burst):
+        """Takes a token, returns False if there was none left"""
+        self.tokens = min(burst, self.tokens + (now - self.stamp) * rate)
+        self.stamp = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class SpamDetector:
+    """Flags message floods with constant work per message
+
+    Keeps token buckets per (server, user), per channel and per (server,
+    user, message text). Each table is an LRU capped at max_tracked
+    buckets, so memory stays bounded however many users are active. A
+    channel going over its rate enters raid mode for RAID_DURATION
+    seconds."""
+
+    def __init__(self, max_tracked=MAX_TRACKED):
+        self.max_tracked = max_tracked
+        self.users = OrderedDict()
+        self.channels = OrderedDict()
+        self.texts = OrderedDict()
+        self.raids = {}  # Channel id -> end of raid mode
+
+    def _bucket(self, table, key, burst, now):
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = TokenBucket(burst, now)
+            if len(table) > self.max_tracked:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return bucket
+
+    def in_raid(self, channel, now=None):
+        now = time.monotonic() if now is None else now
+        return self.raids.get(channel.id, 0) > now
+
+    def check(self, message, now=None, text=None):
+        """Returns why message looks like spam, or None
+
+        text is the normalized content, if the caller has it already."""
+        now = time.monotonic() if now is None else now
+        server = message.server.id
+        channel = message.channel.id
+        author = message.author.id
+
+        bucket = self._bucket(self.channels, channel, CHANNEL_BURST, now)
+        if not bucket.take(now, CHANNEL_RATE, CHANNEL_BURST):
+            if self.raids.get(channel, 0) <= now:
+                log.warning("Raid mode on in #{} ({})".format(
+                    message.channel.name, message.server.name))
+            self.raids[channel] = now + RAID_DURATION
+        elif channel in self.raids and self.raids[channel] <= now:
+            del self.raids[channel]
+        factor = 0.5 if channel in self.raids else 1
+
+        burst = USER_BURST * factor
+        bucket = self._bucket(self.users, (server, author), burst, now)
+        if not bucket.take(now, USER_RATE, burst):
+            return "flood"
+
+        if message.content:
+            if text is None:
+                text = normalize(message.content)
+            key = (server, author, hash(text))
+            burst = DUPLICATE_BURST * factor
+            bucket = self._bucket(self.texts, key, burst, now)
+            if not bucket.take(now, DUPLICATE_RATE, burst):
+                return "duplicate"
+        return None
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m cogs.utils.antispam [messages] [users]
+    from types import SimpleNamespace
+    import random
+    import sys
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    servers = [SimpleNamespace(id=str(i), name=str(i)) for i in range(50)]
+    channels = [SimpleNamespace(id=str(i), name=str(i)) for i in range(500)]
+    authors = [SimpleNamespace(id=str(i)) for i in range(users)]
+    texts = ["hi", "lol", "gg", "anyone up for a game?", "ＦＲＥＥ ＮＩＴＲＯ"]
+    rng = random.Random(0)
+    messages = []
+    for i in range(count):
+        channel = rng.choice(channels)
+        messages.append(SimpleNamespace(
+            server=servers[int(channel.id) % len(servers)], channel=channel,
+            author=rng.choice(authors), content=rng.choice(texts)))
+    logging.disable(logging.WARNING)  # Random traffic starts raids
+    detector = SpamDetector()
+    flagged = 0
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        if detector.check(message, now=i / 1000) is not None:
+            flagged += 1
+    elapsed = time.perf_counter() - start
+    print("{} messages from {} users: {:.1f}us per message, {} flagged, "
+          "{} buckets".format(count, users, elapsed / count * 10**6, flagged,
+                              len(detector.users) + len(detector.channels) +
+                              len(detector.texts)))
@@ -0,0 +1,225 @@
+from .dataIO import dataIO, SQLITE_PATH
+import tempfile
+import tarfile
+import hashlib
+import shutil
+import json
+import io
+import time
+import os
+
+# A backup is a gzipped tar of everything under data/, in the same layout,
+# followed by MANIFEST.json with the size and SHA-256 of each file. Files
+# are streamed in chunks both ways, so memory use doesn't depend on their
+# size.
+
+DATA_ROOT = "data"
+BACKUP_FOLDER = "backups"
+MANIFEST = "MANIFEST.json"
+CHUNK = 2**16
+SKIP_FOLDERS = ("data/audio/cache",)  # Can be downloaded again
+# Temp files, rolling backups, indexes rebuilt on load, leftovers of
+# migrations. The SQLite store is copied through its backup API instead.
+SKIP_SUFFIXES = (".tmp", ".bak", ".idx", ".imported", "-wal", "-shm")
+# Files that go with a document and would be replayed on top of it
+SIDECARS = (".journal", ".journal.old", "-wal", "-shm")
+
+
+def _name(path):
+    return path.replace("\\", "/")
+
+
+class _HashingReader:
+    """Reads at most size bytes of f, hashing them"""
+
+    def __init__(self, f, size):
+        self.f = f
+        self.left = size
+        self.hash = hashlib.sha256()
+
+    def read(self, n=-1):
+        if n < 0 or n > self.left:
+            n = self.left
+        data = self.f.read(n)
+        self.left -= len(data)
+        self.hash.update(data)
+        return data
+
+
+class Snapshot:
+    """A consistent view of all cog data, to be written to an archive
+
+    take() runs on the event loop, so no coroutine can change anything
+    halfway: writes are paused, then every file is opened and its size
+    recorded. Append only files (journals, the name store log) are only
+    read up to that size. Pending saves should be flushed first with
+    dataIO.sync(), which take() does unless sync is False so the bot can
+    run it in an executor. write(), which also copies the SQLite store,
+    is slow and meant for an executor too. close() resumes writes.
+
+    Only the data store of this process is paused, so a snapshot taken
+    by another process while Red runs isn't guaranteed consistent."""
+
+    def __init__(self, root=DATA_ROOT):
+        self.root = root
+        self.files = []  # (archive name, file object, size)
+        self._tmp = None
+        self._paused = False
+
+    def take(self, sync=True):
+        if sync:
+            dataIO.sync()
+        dataIO.pause()
+        self._paused = True
+        for folder, dirs, files in os.walk(self.root):
+            dirs[:] = sorted(d for d in dirs if _name(os.path.join(
+                folder, d)) not in SKIP_FOLDERS)
+            for f in sorted(files):
+                path = os.path.join(folder, f)
+                name = _name(path)
+                if name.endswith(SKIP_SUFFIXES) or name == SQLITE_PATH:
+                    continue
+                try:
+                    fobj = open(path, "rb")
+                except FileNotFoundError:
+                    continue
+                size = os.fstat(fobj.fileno()).st_size
+                self.files.append((name, fobj, size))
+        return self
+
+    def _copy_sqlite(self):
+        fd, self._tmp = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        dataIO.sqlite.backup(self._tmp)
+        fobj = open(self._tmp, "rb")
+        size = os.fstat(fobj.fileno()).st_size
+        self.files.append((SQLITE_PATH, fobj, size))
+
+    def write(self, path):
+        """Streams the snapshot to a .tar.gz at path, returns the manifest"""
+        if dataIO.sqlite.available and self._tmp is None:
+            self._copy_sqlite()  # Nothing is flushed to it while paused
+        manifest = {"CREATED": int(time.time()), "FILES": {}}
+        tmp_path = path + ".tmp"
+        with tarfile.open(tmp_path, "w:gz") as tar:
+            for name, fobj, size in self.files:
+                info = tarfile.TarInfo(name)
+                info.size = size
+                info.mtime = os.fstat(fobj.fileno()).st_mtime
+                reader = _HashingReader(fobj, size)
+                tar.addfile(info, reader)
+                manifest["FILES"][name] = {"SIZE": size,
+                                           "SHA256": reader.hash.hexdigest()}
+            raw = json.dumps(manifest, indent=4, sort_keys=True).encode()
+            info = tarfile.TarInfo(MANIFEST)
+            info.size = len(raw)
+            info.mtime = manifest["CREATED"]
+            tar.addfile(info, io.BytesIO(raw))
+        os.replace(tmp_path, path)
+        return manifest
+
+    def close(self):
+        for _, fobj, _ in self.files:
+            fobj.close()
+        self.files = []
+        if self._tmp is not None:
+            os.remove(self._tmp)
+            self._tmp = None
+        if self._paused:
+            self._paused = False
+            dataIO.resume()
+
+
+def backup_path(folder=BACKUP_FOLDER):
+    if not os.path.exists(folder):
+        print("Creating " + folder + " folder...")
+        os.makedirs(folder)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(folder, "red-{}.tar.gz".format(stamp))
+
+
+def export(path=None, root=DATA_ROOT):
+    """Writes a backup of root to path. Returns (path, manifest)"""
+    path = path or backup_path()
+    snapshot = Snapshot(root)
+    try:
+        snapshot.take()
+        return path, snapshot.write(path)
+    finally:
+        snapshot.close()
+
+
+def _safe_name(name):
+    parts = name.split("/")
+    return (not name.startswith("/") and ".." not in parts and
+            ":" not in parts[0] and parts[0] == DATA_ROOT)
+
+
+def verify(archive, staging=None):
+    """Checks every file of archive against its manifest
+
+    If staging is given the files are also extracted there. Returns the
+    manifest, raises ValueError if anything doesn't match."""
+    digests = {}
+    manifest = None
+    with tarfile.open(archive, "r:gz") as tar:
+        for member in tar:
+            if member.name == MANIFEST:
+                manifest = json.loads(tar.extractfile(member).read().decode())
+                continue
+            if not member.isfile() or not _safe_name(member.name):
+                raise ValueError("Unexpected entry " + member.name)
+            src = tar.extractfile(member)
+            h = hashlib.sha256()
+            dest = None
+            if staging is not None:
+                dest_path = os.path.join(staging, member.name)
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                dest = open(dest_path, "wb")
+            try:
+                for chunk in iter(lambda: src.read(CHUNK), b""):
+                    h.update(chunk)
+                    if dest is not None:
+                        dest.write(chunk)
+            finally:
+                if dest is not None:
+                    dest.close()
+            digests[member.name] = (member.size, h.hexdigest())
+    if manifest is None:
+        raise ValueError("The archive has no manifest")
+    expected = {name: (f["SIZE"], f["SHA256"])
+                for name, f in manifest["FILES"].items()}
+    if digests != expected:
+        bad = sorted(set(digests.items()) ^ set(expected.items()))
+        raise ValueError("Checksum mismatch: " +
+                         ", ".join(sorted(set(n for n, _ in bad))))
+    return manifest
+
+
+def restore(archive, root="."):
+    """Replaces the files in the backup, the bot must not be running
+
+    Everything is extracted and checked before the first file is replaced.
+    Journals, WAL files and indexes left next to a restored file are
+    removed so they don't get replayed on top of it."""
+    staging = tempfile.mkdtemp(prefix=".restore-", dir=root)
+    try:
+        manifest = verify(archive, staging)
+        for name in sorted(manifest["FILES"]):
+            target = os.path.join(root, name)
+            for suffix in SIDECARS:
+                sidecar = name + suffix
+                if (sidecar not in manifest["FILES"] and
+                        os.path.isfile(os.path.join(root, sidecar))):
+                    os.remove(os.path.join(root, sidecar))
+            if name.endswith(".log"):  # KVStore, the index gets rebuilt
+                index = os.path.join(root, name[:-4] + ".idx")
+                if os.path.isfile(index):
+                    os.remove(index)
+            folder = os.path.dirname(target)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            os.replace(os.path.join(staging, name), target)
+        return manifest
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
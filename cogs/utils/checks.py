@@ -36,6 +36,67 @@ def check_permissions(ctx, perms):
     resolved = ch.permissions_for(author)
     return all(getattr(resolved, name, None) == value for name, value in perms.items())
 
+ADMIN = 1
+MOD = 2
+
+class PrivilegeResolver:
+    """Tells whether members hold the server's admin or mod role
+
+    The configured role names are matched (case insensitive) against the
+    server's roles once, then each member's privileges are cached as bits,
+    so a check is a couple of dict lookups. Entries go stale when the
+    settings change and are dropped by red.py on member and role updates."""
+
+    def __init__(self):
+        self._servers = {} # server id: (ServerRoles, admin ids, mod ids)
+        self._members = {} # server id: {member id: bits}
+
+    def _role_ids(self, server):
+        roles = settings.get_server_roles(server)
+        cached = self._servers.get(server.id)
+        if cached is not None and cached[0] is roles:
+            return cached
+        admin = frozenset(r.id for r in server.roles
+                          if r.name.lower() == roles.admin_lower)
+        mod = frozenset(r.id for r in server.roles
+                        if r.name.lower() == roles.mod_lower)
+        cached = (roles, admin, mod)
+        self._servers[server.id] = cached
+        self._members[server.id] = {}
+        return cached
+
+    def privileges(self, member):
+        _, admin, mod = self._role_ids(member.server)
+        members = self._members[member.server.id]
+        try:
+            return members[member.id]
+        except KeyError:
+            pass
+        ids = {r.id for r in member.roles}
+        bits = 0
+        if not admin.isdisjoint(ids):
+            bits |= ADMIN
+        if not mod.isdisjoint(ids):
+            bits |= MOD
+        members[member.id] = bits
+        return bits
+
+    def is_admin(self, member):
+        return bool(self.privileges(member) & ADMIN)
+
+    def is_mod(self, member):
+        """Admins count as mods"""
+        return bool(self.privileges(member) & (ADMIN | MOD))
+
+    def invalidate_server(self, server):
+        self._servers.pop(server.id, None)
+        self._members.pop(server.id, None)
+
+    def invalidate_member(self, member):
+        self._members.get(member.server.id, {}).pop(member.id, None)
+
+resolver = PrivilegeResolver()
+
 def role_or_permissions(ctx, check, **perms):
     if check_permissions(ctx, perms):
         return True
@@ -50,18 +111,21 @@ def role_or_permissions(ctx, check, **perms):
 
 def mod_or_permissions(**perms):
     def predicate(ctx):
-        server = ctx.message.server
-        mod_role = settings.get_server_mod(server).lower()
-        admin_role = settings.get_server_admin(server).lower()
-        return role_or_permissions(ctx, lambda r: r.name.lower() in (mod_role,admin_role), **perms)
+        if check_permissions(ctx, perms):
+            return True
+        if ctx.message.channel.is_private:
+            return False
+        return resolver.is_mod(ctx.message.author)
 
     return commands.check(predicate)
 
 def admin_or_permissions(**perms):
     def predicate(ctx):
-        server = ctx.message.server
-        admin_role = settings.get_server_admin(server)
-        return role_or_permissions(ctx, lambda r: r.name.lower() == admin_role.lower(), **perms)
+        if check_permissions(ctx, perms):
+            return True
+        if ctx.message.channel.is_private:
+            return False
+        return resolver.is_admin(ctx.message.author)
 
     return commands.check(predicate)
 
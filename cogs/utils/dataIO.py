@@ -1,28 +1,737 @@
 import json
+import asyncio
+import threading
+import logging
+import tempfile
+import shutil
+import glob
+import pickle
+import sqlite3
+import time
+import os
+from collections.abc import MutableMapping
+
+try:
+    import orjson
+except:
+    orjson = None
+
+try:
+    import ujson
+except:
+    ujson = None
+
+try:
+    import msgpack
+except:
+    msgpack = None
+
+log = logging.getLogger("red.dataIO")
+
+FLUSH_INTERVAL = 5 # Seconds between each write-behind flush
+JOURNAL_THRESHOLD = 2**20 # Journal size in bytes that triggers a compaction
+
+# pretty: indented and sorted JSON, the historical format
+# compact: JSON without whitespace, encoded by orjson/ujson when installed
+# binary: msgpack when installed, pickle protocol 5 otherwise
+FORMATS = ("pretty", "compact", "binary")
+
+SQLITE_PATH = "data/red/storage.db"
+
+BINARY_MAGIC = b"REDB"  # followed by one byte: m(sgpack) or p(ickle)
+
+
+def _dump(data):
+    return json.dumps(data,indent=4,sort_keys=True,separators=(',',' : '))
+
+def _dump_compact(data):
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError: # Integers over 64 bits
+            pass
+    elif ujson is not None:
+        try:
+            return ujson.dumps(data, ensure_ascii=False).encode("utf-8")
+        except OverflowError:
+            pass
+    return json.dumps(data, separators=(',',':'),
+                      ensure_ascii=False).encode("utf-8")
+
+def _encode(data, fmt="pretty"):
+    if fmt == "pretty":
+        return _dump(data).encode("utf-8")
+    elif fmt == "compact":
+        return _dump_compact(data)
+    elif fmt == "binary":
+        if msgpack is not None:
+            return BINARY_MAGIC + b"m" + msgpack.packb(data, use_bin_type=True)
+        return BINARY_MAGIC + b"p" + pickle.dumps(data, protocol=5)
+    else:
+        raise ValueError("Unknown format: {}".format(fmt))
+
+def _decode(raw):
+    if raw.startswith(BINARY_MAGIC):
+        codec = raw[len(BINARY_MAGIC):len(BINARY_MAGIC) + 1]
+        payload = raw[len(BINARY_MAGIC) + 1:]
+        if codec == b"m":
+            if msgpack is None:
+                raise RuntimeError("msgpack is needed to read this file")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        elif codec == b"p":
+            return pickle.loads(payload)
+        raise ValueError("Unknown binary codec: {}".format(codec))
+    # orjson would silently turn integers over 64 bits into floats, the
+    # stdlib decoder is exact and fast enough for loading
+    return json.loads(raw.decode("utf-8"))
+
+def detect_format(filename):
+    with open(filename, mode="rb") as f:
+        head = f.read(len(BINARY_MAGIC) + 1)
+        if head.startswith(BINARY_MAGIC):
+            return "binary"
+        f.seek(0)
+        start = f.read(64)
+    return "pretty" if b"\n" in start.strip() else "compact"
+
+def _backup_name(filename, n):
+    return "{}.{}.bak".format(filename, n)
+
+def _rotate_backups(filename, backups):
+    for n in range(backups - 1, 0, -1):
+        if os.path.isfile(_backup_name(filename, n)):
+            os.replace(_backup_name(filename, n), _backup_name(filename, n + 1))
+    shutil.copy2(filename, _backup_name(filename, 1))
+
+def _fsync_dir(folder):
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError: # Directories can't be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _write(filename, data, backups=0, fmt="pretty"):
+    """Atomically replaces filename
+
+    The document goes to a sibling temp file which is fsynced and then
+    renamed over the target, so a crash leaves either the old or the new
+    file, never a truncated one. Up to `backups` previous versions are
+    kept as filename.N.bak"""
+    payload = _encode(data, fmt) # Can fail on concurrent mutation
+    folder, name = os.path.split(os.path.abspath(filename))
+    fd, tmp_file = tempfile.mkstemp(prefix=name + ".", suffix=".tmp",
+                                    dir=folder)
+    try:
+        with os.fdopen(fd, mode="wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.isfile(filename):
+            shutil.copymode(filename, tmp_file)
+            if backups:
+                _rotate_backups(filename, backups)
+        os.replace(tmp_file, filename)
+    except:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(folder)
+
+def _read(filename):
+    with open(filename, mode="rb") as f:
+        return _decode(f.read())
+
+def _load(filename):
+    try:
+        return _read(filename)
+    except ValueError:
+        backups = sorted(glob.glob(glob.escape(filename) + ".*.bak"),
+                         key=os.path.getmtime, reverse=True)
+        for backup in backups:
+            try:
+                data = _read(backup)
+            except ValueError:
+                continue
+            log.warning("{} is corrupted, loaded {} instead".format(
+                filename, backup))
+            return data
+        raise
 
 def fileIO(filename, IO, data=None):
     if IO == "save" and data != None:
-        with open(filename, encoding='utf-8', mode="w") as f:
-            f.write(json.dumps(data,indent=4,sort_keys=True,separators=(',',' : ')))
+        dataIO.write(filename, data)
     elif IO == "load" and data == None:
-        with open(filename, encoding='utf-8', mode="r") as f:
-            return json.loads(f.read())
+        return dataIO.load(filename)
     elif IO == "check" and data == None:
-        try:
-            with open(filename, encoding='utf-8', mode="r") as f:
-                return True
-        except:
-            return False
+        return dataIO.exists(filename)
     else:
         raise("Invalid fileIO call")
 
 def get_value(filename, key):
-    with open(filename, encoding='utf-8', mode="r") as f:
-        data = json.loads(f.read())
+    data = fileIO(filename, "load")
     return data[key]
 
 def set_value(filename, key, value):
     data = fileIO(filename, "load")
     data[key] = value
-    fileIO(filename, "save", data)
-    return True
\ No newline at end of file
+    dataIO.write(filename, data, keys=(key,))
+    return True
+
+def convert(filename, fmt, backups=0):
+    """Rewrites an existing document in place in another format
+
+    fmt is one of FORMATS or "sqlite". Any format can be read back, so this
+    only affects size and speed."""
+    if fmt not in FORMATS + ("sqlite",):
+        raise ValueError("Unknown format: {}".format(fmt))
+    data = fileIO(filename, "load")
+    dataIO.discard(filename)
+    if fmt == "sqlite":
+        dataIO.sqlite.import_json(filename, data)
+    else:
+        _write(filename, data, backups=backups, fmt=fmt)
+        dataIO.sqlite.drop(filename)
+
+
+class SQLiteBackend:
+    """Stores documents in a single SQLite database in WAL mode
+
+    Dict documents are stored one row per top level key, so updating a
+    single account is an UPSERT of one row instead of a full rewrite.
+    Anything else is stored whole under the empty key. Documents are named
+    after the JSON file they were imported from."""
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._conn = None
+        self._documents = {}  # name: keyed
+        self._lock = threading.RLock()
+
+    @property
+    def available(self):
+        return self._conn is not None or os.path.isfile(self.path)
+
+    def connect(self):
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS documents ("
+                         "name TEXT PRIMARY KEY, keyed INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                         "doc TEXT NOT NULL, key TEXT NOT NULL, "
+                         "value TEXT NOT NULL, PRIMARY KEY (doc, key)) "
+                         "WITHOUT ROWID")
+            conn.commit()
+            self._documents = dict(conn.execute(
+                "SELECT name, keyed FROM documents"))
+            self._conn = conn
+            return conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def backup(self, path):
+        """Copies the database to path, consistently"""
+        target = sqlite3.connect(path)
+        try:
+            with self._lock:
+                self.connect().backup(target)
+        finally:
+            target.close()
+
+    def has(self, doc):
+        if not self.available:
+            return False
+        self.connect()
+        return doc in self._documents
+
+    def load(self, doc):
+        with self._lock:
+            rows = self.connect().execute(
+                "SELECT key, value FROM entries WHERE doc = ?", (doc,))
+            if self._documents[doc]:
+                return {k: json.loads(v) for k, v in rows}
+            for k, v in rows:
+                return json.loads(v)
+
+    def write(self, doc, data, keys=None):
+        """Replaces the document, or only `keys` of it if given
+
+        Keys that are not in data anymore are deleted."""
+        keyed = isinstance(data, dict)
+        with self._lock, self.connect() as conn:
+            if keys is None or not keyed or not self._documents.get(doc):
+                conn.execute("INSERT INTO documents (name, keyed) "
+                             "VALUES (?, ?) ON CONFLICT(name) DO UPDATE "
+                             "SET keyed = excluded.keyed", (doc, int(keyed)))
+                conn.execute("DELETE FROM entries WHERE doc = ?", (doc,))
+                self._documents[doc] = keyed
+                if keyed:
+                    for k, v in data.items():
+                        self._upsert(conn, doc, k, v)
+                else:
+                    self._upsert(conn, doc, "", data)
+                return
+            for k in keys:
+                k = str(k)
+                if k in data:
+                    self._upsert(conn, doc, k, data[k])
+                else:
+                    conn.execute("DELETE FROM entries WHERE doc = ? AND "
+                                 "key = ?", (doc, k))
+
+    def drop(self, doc):
+        if not self.has(doc):
+            return
+        with self._lock, self.connect() as conn:
+            conn.execute("DELETE FROM entries WHERE doc = ?", (doc,))
+            conn.execute("DELETE FROM documents WHERE name = ?", (doc,))
+            del self._documents[doc]
+
+    def import_json(self, filename, data=None):
+        """Moves a JSON document into the database
+
+        The original file is kept as filename.imported"""
+        if data is None:
+            data = _load(filename)
+        self.write(filename, data)
+        if os.path.isfile(filename):
+            os.replace(filename, filename + ".imported")
+
+    def _upsert(self, conn, doc, key, value):
+        conn.execute("INSERT INTO entries (doc, key, value) VALUES (?, ?, ?) "
+                     "ON CONFLICT(doc, key) DO UPDATE SET value = "
+                     "excluded.value",
+                     (doc, str(key), json.dumps(value, separators=(',',':'))))
+
+
+class JournaledDocument(MutableMapping):
+    """Dict document that logs mutations instead of rewriting itself
+
+    Every change appends a small record to filename.journal. Loading
+    replays the journal onto the last snapshot, which is the document
+    itself, and once the journal passes `threshold` bytes the data store's
+    flusher writes a new snapshot and starts a fresh journal.
+
+    Records are [op, key, ...]: s(et) a value, d(elete) a key or set a
+    f(ield) of a value. Increments are logged as their result so that
+    replaying a journal onto a newer snapshot is harmless."""
+
+    def __init__(self, filename, threshold=JOURNAL_THRESHOLD):
+        self.filename = filename
+        self.threshold = threshold
+        self.journal_path = filename + ".journal"
+        self.data = dataIO.load(filename) if dataIO.exists(filename) else {}
+        self.replayed = 0
+        for path in (self.journal_path + ".old", self.journal_path):
+            self._replay(path)
+        self._journal = self._open_journal()
+        self.compactions = 0
+        dataIO.register_journal(self)
+
+    def _open_journal(self):
+        journal = open(self.journal_path, encoding='utf-8', mode="a")
+        if journal.tell():
+            with open(self.journal_path, mode="rb") as f:
+                f.seek(-1, os.SEEK_END)
+                complete = f.read(1) == b"\n"
+            if not complete:
+                # The last record was written but not its newline, it was
+                # replayed so keep it, on a line of its own
+                journal.write("\n")
+                journal.flush()
+        return journal
+
+    def _replay(self, path):
+        if not os.path.isfile(path):
+            return
+        with open(path, mode="rb") as f:
+            lines = f.readlines()
+        good = 0
+        for n, line in enumerate(lines):
+            try:
+                record = json.loads(line.decode("utf-8"))
+            except ValueError:
+                if n == len(lines) - 1: # Torn write at the end, drop it
+                    with open(path, mode="r+b") as f:
+                        f.truncate(good)
+                    break
+                raise
+            self._apply(record)
+            self.replayed += 1
+            good += len(line)
+
+    def _apply(self, record):
+        op, key = record[0], record[1]
+        if op == "s":
+            self.data[key] = record[2]
+        elif op == "d":
+            self.data.pop(key, None)
+        elif op == "f":
+            self.data[key][record[2]] = record[3]
+
+    def _log(self, *record):
+        self._journal.write(json.dumps(record, separators=(',',':')) + "\n")
+        self._journal.flush()
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self._log("s", key, value)
+
+    def __delitem__(self, key):
+        del self.data[key]
+        self._log("d", key)
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def set_field(self, key, field, value):
+        self.data[key][field] = value
+        self._log("f", key, field, value)
+
+    def incr(self, key, field, amount):
+        """Adds amount to a numeric field and returns the new value"""
+        value = self.data[key][field] + amount
+        self.set_field(key, field, value)
+        return value
+
+    def touch(self, key):
+        """Logs key again after its value was mutated in place"""
+        self._log("s", key, self.data[key])
+
+    @property
+    def journal_size(self):
+        return self._journal.tell()
+
+    @property
+    def needs_compaction(self):
+        return self.journal_size > self.threshold
+
+    def _rotate(self):
+        """Moves the journal aside and returns a snapshot to write
+
+        If an older journal is still around the last compaction failed, so
+        the current journal just keeps growing until this one succeeds."""
+        if not os.path.isfile(self.journal_path + ".old"):
+            self._journal.close()
+            os.replace(self.journal_path, self.journal_path + ".old")
+            self._journal = self._open_journal()
+        return dict(self.data)
+
+    def _write_snapshot(self, snapshot):
+        # Values may change while this runs off the loop. Whatever ends up
+        # in the snapshot, replaying the current journal fixes it up.
+        # Forced, the old journal must only go once the snapshot is written
+        dataIO.write(self.filename, snapshot, force=True)
+        os.remove(self.journal_path + ".old")
+        self.compactions += 1
+
+    def compact(self):
+        self._write_snapshot(self._rotate())
+
+    async def compact_async(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        snapshot = self._rotate()
+        await loop.run_in_executor(None, self._write_snapshot, snapshot)
+
+    def sync(self):
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def close(self):
+        if self._journal.closed:
+            return
+        self.sync()
+        self._journal.close()
+        dataIO.unregister_journal(self)
+
+
+class DataIO:
+    """Write-behind store for cog data
+
+    save() only marks a document as dirty. Many mutations of the same
+    document between two flushes are coalesced into a single write, which
+    happens off the event loop every `interval` seconds and at shutdown.
+    Documents imported into SQLite are read from and written to the
+    database instead of their JSON file."""
+
+    def __init__(self, interval=FLUSH_INTERVAL):
+        self.interval = interval
+        self.sqlite = SQLiteBackend()
+        self._journals = {}  # filename: JournaledDocument
+        self._dirty = {}  # filename: live document
+        self._dirty_keys = {}  # filename: set of changed keys, None for all
+        self._options = {}  # filename: write options, see configure()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._paused = 0
+        self._failing = set()  # Documents whose last write failed
+        self.saves = 0          # save() calls
+        self.writes = 0         # documents actually written to disk
+        self.failed_writes = 0
+        self.flushes = 0
+        self.last_flush = 0.0   # seconds spent in the last flush
+        self.max_flush = 0.0
+        self.total_flush = 0.0
+
+    def configure(self, filename, **options):
+        """Sets per-file write options
+
+        backups: number of rolling .bak copies kept on each write
+        fmt: one of FORMATS. By default files keep the format they're in,
+        e.g. after a conversion, and new ones are "pretty"."""
+        if options.get("fmt", "pretty") not in FORMATS:
+            raise ValueError("Unknown format: {}".format(options["fmt"]))
+        self._options.setdefault(filename, {}).update(options)
+
+    def options(self, filename):
+        options = self._options.get(filename, {})
+        if "fmt" not in options:
+            try:
+                options = dict(options, fmt=detect_format(filename))
+            except OSError:  # New file
+                pass
+        return options
+
+    def save(self, filename, data, keys=None):
+        """Marks filename dirty. data is written on the next flush.
+
+        keys optionally lists the top level keys that changed, which lets
+        keyed backends skip the rest of the document."""
+        with self._lock:
+            self._mark(filename, data, keys)
+            self.saves += 1
+
+    def write(self, filename, data, keys=None, force=False):
+        """Writes filename right away
+
+        While paused the write is queued like a save() instead, unless
+        forced."""
+        with self._lock:
+            if self._paused and not force:
+                self._mark(filename, data, keys)
+                return
+        self.discard(filename)
+        self._persist(filename, data, keys)
+
+    def load(self, filename):
+        pending = self.pending(filename)
+        if pending is not None:
+            return pending
+        if self.sqlite.has(filename):
+            return self.sqlite.load(filename)
+        return _load(filename)
+
+    def exists(self, filename):
+        if self.pending(filename) is not None or self.sqlite.has(filename):
+            return True
+        try:
+            with open(filename, encoding='utf-8', mode="r") as f:
+                return True
+        except:
+            return False
+
+    def pending(self, filename):
+        """Returns the unflushed document for filename, if any"""
+        with self._lock:
+            return self._dirty.get(filename)
+
+    def discard(self, filename):
+        with self._lock:
+            self._dirty.pop(filename, None)
+            self._dirty_keys.pop(filename, None)
+
+    @property
+    def pending_writes(self):
+        with self._lock:
+            return len(self._dirty)
+
+    def _mark(self, filename, data, keys, requeue=False):
+        if keys is None:
+            self._dirty_keys[filename] = None
+        elif filename not in self._dirty:
+            self._dirty_keys[filename] = set(keys)
+        elif self._dirty_keys[filename] is not None:
+            self._dirty_keys[filename].update(keys)
+        if not requeue or filename not in self._dirty:
+            self._dirty[filename] = data
+
+    def _persist(self, filename, data, keys=None):
+        if self.sqlite.has(filename):
+            self.sqlite.write(filename, data, keys)
+        else:
+            _write(filename, data, **self.options(filename))
+
+    def flush(self, force=False):
+        """Writes every dirty document. Safe to call from any thread.
+
+        Does nothing while paused, unless forced."""
+        with self._flush_lock:
+            with self._lock:
+                if self._paused and not force:
+                    return 0
+                dirty, self._dirty = self._dirty, {}
+                dirty_keys, self._dirty_keys = self._dirty_keys, {}
+            if not dirty:
+                return 0
+            start = time.perf_counter()
+            written = 0
+            for filename, data in dirty.items():
+                keys = dirty_keys[filename]
+                try:
+                    self._persist(filename, data, keys)
+                except RuntimeError:
+                    # The document was mutated while being serialized.
+                    # Requeue it, merging with any newer save.
+                    with self._lock:
+                        self._mark(filename, data, keys, requeue=True)
+                except Exception as e:
+                    # Disk full, missing folder, file or database locked...
+                    # Keep it for the next flush rather than losing it.
+                    self.failed_writes += 1
+                    with self._lock:
+                        self._mark(filename, data, keys, requeue=True)
+                    if filename not in self._failing:
+                        self._failing.add(filename)
+                        log.exception("Couldn't write {}, will retry: "
+                                      "{}".format(filename, e))
+                else:
+                    written += 1
+                    if filename in self._failing:
+                        self._failing.discard(filename)
+                        log.info("Wrote {} after failing to".format(filename))
+            elapsed = time.perf_counter() - start
+            self.writes += written
+            self.flushes += 1
+            self.last_flush = elapsed
+            self.max_flush = max(self.max_flush, elapsed)
+            self.total_flush += elapsed
+            return written
+
+    async def flush_async(self, loop=None):
+        loop = loop or asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.flush)
+
+    def pause(self):
+        """Holds writes back, e.g. while a backup reads the files
+
+        Saves and writes keep being coalesced in memory until resume() is
+        called as many times as pause() was, and the next flush. Journals
+        stay open for appends but are not compacted."""
+        with self._lock:
+            self._paused += 1
+
+    def resume(self):
+        with self._lock:
+            self._paused -= 1
+
+    @property
+    def paused(self):
+        return self._paused > 0
+
+    def sync(self):
+        """Flushes every document and makes journals durable"""
+        self.flush(force=True)
+        for document in list(self._journals.values()):
+            document.sync()
+
+    def register_journal(self, document):
+        self._journals[document.filename] = document
+
+    def unregister_journal(self, document):
+        if self._journals.get(document.filename) is document:
+            del self._journals[document.filename]
+
+    async def flusher(self, loop=None):
+        """Periodically flushes dirty documents and compacts journals.
+
+        Meant to run as a task."""
+        loop = loop or asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.paused:
+                continue
+            if self.pending_writes:
+                await self.flush_async(loop)
+            for document in list(self._journals.values()):
+                if document.needs_compaction:
+                    try:
+                        await document.compact_async(loop)
+                    except Exception as e:
+                        log.exception("Couldn't compact {}: {}".format(
+                            document.filename, e))
+
+    def close(self):
+        self.flush(force=True)
+        with self._lock:
+            unwritten = sorted(self._dirty)
+        if unwritten:
+            log.error("Couldn't write, changes lost: " + ", ".join(unwritten))
+        for document in list(self._journals.values()):
+            document.close()
+        self.sqlite.close()
+
+    def stats(self):
+        avg = self.total_flush / self.flushes if self.flushes else 0.0
+        return {"PENDING" : self.pending_writes, "SAVES" : self.saves,
+                "WRITES" : self.writes, "FAILED" : self.failed_writes,
+                "FLUSHES" : self.flushes,
+                "LAST_FLUSH_MS" : round(self.last_flush * 1000, 2),
+                "AVG_FLUSH_MS" : round(avg * 1000, 2),
+                "MAX_FLUSH_MS" : round(self.max_flush * 1000, 2)}
+
+dataIO = DataIO()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Converts Red's data files "
+                                     "between storage formats. sqlite moves "
+                                     "them into " + SQLITE_PATH)
+    parser.add_argument("format", choices=FORMATS + ("sqlite",))
+    parser.add_argument("files", nargs="+", help="Files or glob patterns, "
+                        "e.g. data/*/*.json")
+    parser.add_argument("--backups", type=int, default=0,
+                        help="Keep N backups of the original files")
+    args = parser.parse_args()
+    files = []
+    for pattern in args.files:
+        files.extend(sorted(glob.glob(pattern)) or [pattern])
+    for filename in files:
+        if (args.format == "sqlite" and
+                filename.replace("\\", "/").startswith("data/red/")):
+            print("{}: skipped, core files stay on disk".format(filename))
+            continue
+        if dataIO.sqlite.has(filename):
+            before, size = "sqlite", None
+        else:
+            before, size = detect_format(filename), os.path.getsize(filename)
+        print("{}: {} -> {}".format(filename, before, args.format), end="")
+        convert(filename, args.format, backups=args.backups)
+        if size is not None and args.format != "sqlite":
+            print(" ({} -> {} bytes)".format(size, os.path.getsize(filename)))
+        else:
+            print()
+    dataIO.close()
@@ -0,0 +1,362 @@
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import threading
+import hashlib
+import atexit
+import struct
+import mmap
+import json
+import os
+
+# An append-only value log plus a memory mapped open addressing hash table
+# pointing into it. Only the keys that are actually used get decoded and kept
+# in memory, in an LRU cache. The rest stays on disk.
+#
+# <path>.log: records of [key length][value length][key][value as JSON]
+#             a value length of TOMBSTONE marks a deletion
+# <path>.idx: header, then `capacity` slots of [key hash][log offset][size]
+
+INDEX_MAGIC = b"REDKVIX1"
+HEADER = struct.Struct("<8sQQQQQB7x")  # magic, capacity, count, used slots,
+                                       # log end, garbage bytes, clean flag
+SLOT = struct.Struct("<QQI4x")  # key hash (0 = empty), log offset, value size
+RECORD = struct.Struct("<II")
+TOMBSTONE = 0xFFFFFFFF
+DELETED = 0xFFFFFFFFFFFFFFFF  # slot offset of a deleted key
+MIN_CAPACITY = 1024
+
+
+def _hash(key):
+    h = int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+    return h or 1
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':')).encode("utf-8")
+
+
+class KVStore(MutableMapping):
+    """Lazily loaded, disk backed dict with string keys
+
+    Lookups and membership tests go through the mmap'd index and only
+    decode the requested value. Writes append to the log, so they cost the
+    size of the value instead of the whole map.
+
+    Values handed out are the cached objects: mutating one in place does
+    not persist it, assign it back with store[key] = value."""
+
+    def __init__(self, path, cache_size=1024):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._log = open(path + ".log", "a+b")
+        self._log.seek(0, os.SEEK_END)
+        self._idx_file = None
+        self._idx = None
+        self._open_index()
+        atexit.register(self.close)
+
+    # Index handling
+
+    def _open_index(self):
+        idx_path = self.path + ".idx"
+        log_size = self._log.seek(0, os.SEEK_END)
+        trusted = False
+        if os.path.isfile(idx_path) and os.path.getsize(idx_path) > HEADER.size:
+            self._map_index(idx_path)
+            magic, capacity, _, _, log_end, _, clean = HEADER.unpack_from(
+                self._idx, 0)
+            expected = HEADER.size + capacity * SLOT.size
+            trusted = (magic == INDEX_MAGIC and clean and
+                       log_end == log_size and len(self._idx) == expected)
+            if not trusted:
+                self._unmap_index()
+        if not trusted:
+            self._rebuild()
+        self._set_header(clean=0)
+        self._idx.flush()
+
+    def _map_index(self, idx_path):
+        self._idx_file = open(idx_path, "r+b")
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0)
+
+    def _unmap_index(self):
+        if self._idx is not None:
+            self._idx.close()
+            self._idx = None
+        if self._idx_file is not None:
+            self._idx_file.close()
+            self._idx_file = None
+
+    def _header(self):
+        return HEADER.unpack_from(self._idx, 0)
+
+    def _set_header(self, capacity=None, count=None, used=None, log_end=None,
+                    garbage=None, clean=None):
+        h = list(self._header())
+        for i, v in enumerate((capacity, count, used, log_end, garbage,
+                               clean), 1):
+            if v is not None:
+                h[i] = v
+        HEADER.pack_into(self._idx, 0, *h)
+
+    def _create_index(self, capacity):
+        """Maps a new empty index, replacing the current one"""
+        self._unmap_index()
+        idx_path = self.path + ".idx"
+        with open(idx_path, "wb") as f:
+            f.write(HEADER.pack(INDEX_MAGIC, capacity, 0, 0, 0, 0, 0))
+            f.truncate(HEADER.size + capacity * SLOT.size)
+        self._map_index(idx_path)
+
+    def _rebuild(self, capacity=MIN_CAPACITY):
+        """Rebuilds the index from the log. Used after an unclean shutdown."""
+        live = {}
+        garbage = 0
+        offset = 0
+        log_size = self._log.seek(0, os.SEEK_END)
+        self._log.seek(0)
+        while True:
+            head = self._log.read(RECORD.size)
+            if len(head) < RECORD.size:
+                break
+            klen, vlen = RECORD.unpack(head)
+            key = self._log.read(klen)
+            size = 0 if vlen == TOMBSTONE else vlen
+            if len(key) < klen or \
+                    self._log.seek(size, os.SEEK_CUR) > log_size:
+                break
+            if key in live:
+                garbage += RECORD.size + len(key) + live[key][1]
+            if vlen == TOMBSTONE:
+                live.pop(key, None)
+                garbage += RECORD.size + klen
+            else:
+                live[key] = (offset, vlen)
+            offset += RECORD.size + klen + size
+        self._log.truncate(offset)  # Drops a torn record at the end
+        self._log.seek(offset)
+        while capacity < len(live) * 2:
+            capacity *= 2
+        self._create_index(capacity)
+        for key, (rec_offset, vlen) in live.items():
+            self._insert_slot(key, rec_offset, vlen)
+        self._set_header(count=len(live), used=len(live), log_end=offset,
+                         garbage=garbage)
+
+    def _slot(self, i):
+        return SLOT.unpack_from(self._idx, HEADER.size + i * SLOT.size)
+
+    def _set_slot(self, i, h, offset, size):
+        SLOT.pack_into(self._idx, HEADER.size + i * SLOT.size, h, offset, size)
+
+    def _read_key(self, offset):
+        self._log.seek(offset)
+        klen, _ = RECORD.unpack(self._log.read(RECORD.size))
+        return self._log.read(klen)
+
+    def _find(self, key):
+        """Returns (slot, found) for key bytes
+
+        If the key is missing slot is where it should be inserted."""
+        capacity = self._header()[1]
+        mask = capacity - 1
+        h = _hash(key)
+        i = h & mask
+        free = None
+        while True:
+            slot_h, offset, _ = self._slot(i)
+            if slot_h == 0:
+                return (free if free is not None else i), False
+            if offset == DELETED:
+                if free is None:
+                    free = i
+            elif slot_h == h and self._read_key(offset) == key:
+                return i, True
+            i = (i + 1) & mask
+
+    def _insert_slot(self, key, offset, size):
+        i, _ = self._find(key)
+        self._set_slot(i, _hash(key), offset, size)
+
+    def _maybe_grow(self):
+        _, capacity, count, used, _, _, _ = self._header()
+        if used * 10 < capacity * 6:
+            return
+        live = [(self._read_key(offset), offset, size)
+                for h, offset, size in map(self._slot, range(capacity))
+                if h and offset != DELETED]
+        if count * 2 >= capacity:
+            capacity *= 2
+        header = self._header()
+        self._create_index(capacity)
+        for key, offset, size in live:
+            self._insert_slot(key, offset, size)
+        self._set_header(count=len(live), used=len(live), log_end=header[4],
+                         garbage=header[5])
+
+    # Log handling
+
+    def _append(self, key, value):
+        offset = self._log.seek(0, os.SEEK_END)
+        if value is None:
+            self._log.write(RECORD.pack(len(key), TOMBSTONE) + key)
+            size = 0
+        else:
+            size = len(value)
+            self._log.write(RECORD.pack(len(key), size) + key + value)
+        self._log.flush()
+        self._set_header(log_end=self._log.tell())
+        return offset, size
+
+    def _read_value(self, offset):
+        self._log.seek(offset)
+        klen, vlen = RECORD.unpack(self._log.read(RECORD.size))
+        self._log.seek(klen, os.SEEK_CUR)
+        return json.loads(self._log.read(vlen).decode("utf-8"))
+
+    def _cache_put(self, key, value):
+        self._cache[key] = value
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    # Mapping interface
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self.misses += 1
+            i, found = self._find(key.encode("utf-8"))
+            if not found:
+                raise KeyError(key)
+            value = self._read_value(self._slot(i)[1])
+            self._cache_put(key, value)
+            return value
+
+    def __setitem__(self, key, value):
+        kb = key.encode("utf-8")
+        with self._lock:
+            i, found = self._find(kb)
+            _, count, used, _, garbage = self._header()[1:6]
+            if found:
+                old_h, old_offset, old_size = self._slot(i)
+                garbage += RECORD.size + len(kb) + old_size
+            else:
+                count += 1
+                if self._slot(i)[0] == 0:
+                    used += 1
+            offset, size = self._append(kb, _dumps(value))
+            self._set_slot(i, _hash(kb), offset, size)
+            self._set_header(count=count, used=used, garbage=garbage)
+            self._cache_put(key, value)
+            self._maybe_grow()
+
+    def __delitem__(self, key):
+        kb = key.encode("utf-8")
+        with self._lock:
+            i, found = self._find(kb)
+            if not found:
+                raise KeyError(key)
+            h, _, old_size = self._slot(i)
+            self._append(kb, None)
+            self._set_slot(i, h, DELETED, 0)
+            _, count, _, _, garbage = self._header()[1:6]
+            garbage += 2 * (RECORD.size + len(kb)) + old_size
+            self._set_header(count=count - 1, garbage=garbage)
+            self._cache.pop(key, None)
+
+    def __contains__(self, key):
+        if not isinstance(key, str):
+            return False
+        with self._lock:
+            if key in self._cache:
+                return True
+            return self._find(key.encode("utf-8"))[1]
+
+    def __iter__(self):
+        with self._lock:
+            capacity = self._header()[1]
+            keys = [self._read_key(offset).decode("utf-8")
+                    for h, offset, _ in map(self._slot, range(capacity))
+                    if h and offset != DELETED]
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            return self._header()[2]
+
+    def update(self, other=(), **kwargs):
+        """Bulk insert, used by importers"""
+        with self._lock:
+            items = other.items() if hasattr(other, "items") else other
+            for key, value in items:
+                self[key] = value
+            for key, value in kwargs.items():
+                self[key] = value
+            self.sync()
+
+    # Maintenance
+
+    @property
+    def garbage(self):
+        """Bytes in the log taken by overwritten or deleted values"""
+        with self._lock:
+            return self._header()[5]
+
+    def compact(self):
+        """Rewrites the log with live values only"""
+        with self._lock:
+            tmp_path = self.path + ".log.tmp"
+            with open(tmp_path, "wb") as tmp:
+                for key in list(self):
+                    kb = key.encode("utf-8")
+                    i, _ = self._find(kb)
+                    self._log.seek(self._slot(i)[1] + RECORD.size + len(kb))
+                    value = self._log.read(self._slot(i)[2])
+                    tmp.write(RECORD.pack(len(kb), len(value)) + kb + value)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            self._log.close()
+            os.replace(tmp_path, self.path + ".log")
+            self._log = open(self.path + ".log", "a+b")
+            self._rebuild(self._header()[1])
+            self._set_header(clean=0)
+
+    def sync(self):
+        with self._lock:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._idx.flush()
+
+    def close(self):
+        with self._lock:
+            if self._idx is None:
+                return
+            log_size = self._log.seek(0, os.SEEK_END)
+            if self.garbage > max(2**20, log_size // 2):
+                self.compact()
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._set_header(clean=1)
+            self._idx.flush()
+            self._unmap_index()
+            self._log.close()
+            self._cache.clear()
+        atexit.unregister(self.close)
+
+    def stats(self):
+        with self._lock:
+            _, capacity, count, used, log_end, garbage, _ = self._header()
+        return {"KEYS" : count, "CAPACITY" : capacity, "LOG_BYTES" : log_end,
+                "GARBAGE_BYTES" : garbage, "CACHED" : len(self._cache),
+                "HITS" : self.hits, "MISSES" : self.misses}
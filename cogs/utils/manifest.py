@@ -0,0 +1,105 @@
+from .dataIO import dataIO
+import hashlib
+import time
+import os
+
+MANIFEST_PATH = "data/red/cog_manifest.json"
+COGS_FOLDER = "cogs"
+
+
+def _sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class CogManifest:
+    """What Red knows about each cog without having to import it
+
+    Keeps an in memory index of the cog files, refreshed only when the
+    folder's mtime changes, and persists per extension:
+
+    PATH: source file
+    MTIME, SHA1: of the source at the last load
+    COMMANDS: top level commands registered at the last load
+    LOADED: unix time of the last load"""
+
+    def __init__(self, path=MANIFEST_PATH, folder=COGS_FOLDER):
+        self.path = path
+        self.folder = folder
+        self._cogs = None
+        self._files = {}  # Extension: source path
+        self._folder_mtime = None
+
+    @property
+    def cogs(self):
+        if self._cogs is None:
+            if dataIO.exists(self.path):
+                self._cogs = dataIO.load(self.path)
+            else:
+                self._cogs = {}
+        return self._cogs
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.folder).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._folder_mtime:
+            return
+        files = {}
+        if mtime is not None:
+            for f in os.listdir(self.folder):
+                if f.endswith(".py") and f != "__init__.py":
+                    files[self.folder + "." + f[:-3]] = \
+                        os.path.join(self.folder, f)
+        self._files = files
+        self._folder_mtime = mtime
+
+    def list(self):
+        """Returns the extension names of every cog file"""
+        self._refresh()
+        return sorted(self._files)
+
+    def exists(self, extension):
+        self._refresh()
+        return extension in self._files
+
+    def changed(self, extension):
+        """Whether the source changed since extension was last loaded"""
+        entry = self.cogs.get(extension)
+        if entry is None or "SHA1" not in entry or not self.exists(extension):
+            return True
+        path = self._files[extension]
+        mtime = os.path.getmtime(path)
+        if mtime == entry["MTIME"]:
+            return False
+        if _sha1(path) != entry["SHA1"]:
+            return True
+        entry["MTIME"] = mtime  # Touched only, no need to hash it again
+        return False
+
+    def commands(self, extension):
+        """Returns {name: {"ALIASES": [...], "HELP": str}}, or None if
+        the extension was never loaded"""
+        return self.cogs.get(extension, {}).get("COMMANDS")
+
+    def record_load(self, extension, bot):
+        """Stores the source version and commands of a loaded extension"""
+        found = {}
+        for command in set(bot.commands.values()):
+            if getattr(command.callback, "__module__", None) == extension:
+                found[command.name] = {"ALIASES": list(command.aliases),
+                                       "HELP": command.help or ""}
+        entry = self.cogs.setdefault(extension, {})
+        entry["COMMANDS"] = found
+        entry["LOADED"] = int(time.time())
+        if self.exists(extension):
+            path = self._files[extension]
+            entry["PATH"] = path.replace("\\", "/")
+            entry["MTIME"] = os.path.getmtime(path)
+            entry["SHA1"] = _sha1(path)
+        if os.path.isdir(os.path.dirname(self.path)):
+            dataIO.save(self.path, self.cogs, keys=[extension])
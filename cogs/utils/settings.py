@@ -1,12 +1,18 @@
 from .dataIO import fileIO
+from collections import namedtuple
 import discord
 import os
 
 default_path = "data/red/settings.json"
 
+# Role names of a server as configured, plus their lowercased forms
+ServerRoles = namedtuple("ServerRoles", "admin mod admin_lower mod_lower")
+
 class Settings:
     def __init__(self,path=default_path):
         self.path = path
+        self._roles = {} # server id: ServerRoles, emptied on every write
+        self._servers = None
         self.check_folders()
         self.default_settings = {"EMAIL" : "EmailHere", "PASSWORD" : "", "OWNER" : "id_here", "PREFIXES" : [], "default":{"ADMIN_ROLE" : "Transistor", "MOD_ROLE" : "Process"}, "LOGIN_TYPE" : "email"}
         if not fileIO(self.path,"check"):
@@ -32,6 +38,8 @@ class Settings:
                 os.makedirs(folder)
 
     def save_settings(self):
+        self._roles = {}
+        self._servers = None
         fileIO(self.path,"save",self.bot_settings)
 
     def update_old_settings(self):
@@ -107,11 +115,13 @@ class Settings:
 
     @property
     def servers(self):
-        ret = {}
-        server_ids = list(filter(lambda x: str(x).isdigit(),self.bot_settings))
-        for server in server_ids:
-            ret.update({server:self.bot_settings[server]})
-        return ret
+        if self._servers is None:
+            ret = {}
+            server_ids = list(filter(lambda x: str(x).isdigit(),self.bot_settings))
+            for server in server_ids:
+                ret.update({server:self.bot_settings[server]})
+            self._servers = ret
+        return self._servers
 
     @property
     def login_type(self):
@@ -128,13 +138,27 @@ class Settings:
         assert isinstance(server,discord.Server)
         return self.bot_settings.get(server.id,self.bot_settings["default"]).copy()
 
+    def get_server_roles(self,server):
+        """Returns the ServerRoles of server, computed once per write
+
+        Called on every message, so the common case is one dict lookup."""
+        sid = server.id if server is not None else None
+        try:
+            return self._roles[sid]
+        except KeyError:
+            pass
+        if sid is None or sid not in self.bot_settings:
+            admin = self.default_admin
+            mod = self.default_mod
+        else:
+            admin = self.bot_settings[sid].get("ADMIN_ROLE","")
+            mod = self.bot_settings[sid].get("MOD_ROLE","")
+        roles = ServerRoles(admin, mod, admin.lower(), mod.lower())
+        self._roles[sid] = roles
+        return roles
+
     def get_server_admin(self,server):
-        if server is None:
-            return self.default_admin
-        assert isinstance(server,discord.Server)
-        if server.id not in self.bot_settings:
-            return self.default_admin
-        return self.bot_settings[server.id].get("ADMIN_ROLE","")
+        return self.get_server_roles(server).admin
 
     def set_server_admin(self,server,value):
         if server is None:
@@ -146,12 +170,7 @@ class Settings:
         self.save_settings()
 
     def get_server_mod(self,server):
-        if server is None:
-            return self.default_mod
-        assert isinstance(server,discord.Server)
-        if server.id not in self.bot_settings:
-            return self.default_mod
-        return self.bot_settings[server.id].get("MOD_ROLE","")
+        return self.get_server_roles(server).mod
 
     def set_server_mod(self,server,value):
         if server is None:
@@ -165,3 +184,39 @@ class Settings:
     def add_server(self,sid):
         self.bot_settings[sid] = self.bot_settings["default"].copy()
         self.save_settings()
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m cogs.utils.settings [messages]
+    # Times the per-message role and server lookups with the caches, and
+    # with them emptied before every message like before they existed.
+    from types import SimpleNamespace
+    import tempfile
+    import random
+    import sys
+    import time
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    os.chdir(tempfile.mkdtemp())
+    settings = Settings()
+    for n in range(100):  # 200 servers, half of them configured
+        settings.bot_settings[str(n)] = {"ADMIN_ROLE": "Admin",
+                                         "MOD_ROLE": "Mod"}
+    settings.save_settings()
+    servers = [SimpleNamespace(id=str(n)) for n in range(200)]
+    rng = random.Random(0)
+    messages = [rng.choice(servers) for _ in range(count)]
+
+    def run(cached):
+        start = time.perf_counter()
+        for server in messages:
+            if not cached:
+                settings._roles = {}
+                settings._servers = None
+            roles = settings.get_server_roles(server)
+            roles.admin_lower, roles.mod_lower
+            server.id in settings.servers
+        return (time.perf_counter() - start) / count * 10**6
+
+    uncached, cached = run(False), run(True)
+    print("{} messages: {:.2f}us per message without the cache, {:.2f}us "
+          "with it".format(count, uncached, cached))
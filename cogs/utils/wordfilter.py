@@ -0,0 +1,96 @@
+import unicodedata
+import re
+
+# The words are compiled into a regex shaped like a trie, e.g. "cat", "car"
+# and "dog" become "ca(?:r|t)|dog". The regex engine then only follows the
+# branches that match the text, instead of trying every word at every
+# position of the message.
+
+# Characters dropped before matching: zero width spaces and joiners, word
+# joiner, BOM, soft hyphen, Mongolian vowel separator
+INVISIBLE = "\u200b\u200c\u200d\u2060\ufeff\u00ad\u180e"
+
+# Lowercase letters from other scripts that render like latin ones. NFKC
+# already takes care of fullwidth, circled and mathematical letters.
+CONFUSABLES = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i",
+    "ї": "i", "ј": "j", "ѕ": "s", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ɡ": "g",
+    "α": "a", "β": "b", "ε": "e", "η": "n", "ι": "i", "κ": "k", "ν": "v",
+    "ο": "o", "ρ": "p", "τ": "t", "υ": "u", "χ": "x", "ω": "w",
+}
+
+_TABLE = str.maketrans(dict(CONFUSABLES, **{c: None for c in INVISIBLE}))
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Folds text to the form the filter matches against
+
+    NFKC, casefold, invisible characters removed, confusables mapped to
+    latin letters and runs of whitespace collapsed to a single space."""
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_TABLE)
+    return _SPACES.sub(" ", text)
+
+
+def _trie(words):
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = None
+    return root
+
+
+def _pattern(node):
+    """Regex for the words below node, longer words are preferred"""
+    branches = []
+    for ch in sorted(k for k in node if k):
+        chain = [ch]
+        child = node[ch]
+        # Runs without branches become plain literals
+        while len(child) == 1 and "" not in child:
+            (ch, child), = child.items()
+            chain.append(ch)
+        branches.append(re.escape("".join(chain)) + _pattern(child))
+    if not branches:
+        return ""
+    if "" in node:
+        return "(?:{})?".format("|".join(branches))
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:{})".format("|".join(branches))
+
+
+class WordFilter:
+    """The filtered words of a server, compiled into one regex
+
+    Matching is a substring search, like checking each word with `in`,
+    but done in a single pass over the message. Both the words and the
+    message go through normalize() first."""
+
+    def __init__(self, words):
+        self.words = {}  # Normalized form -> word as it was added
+        for w in words:
+            folded = normalize(w)
+            if folded.strip():
+                self.words.setdefault(folded, w)
+        if self.words:
+            self._regex = re.compile(_pattern(_trie(self.words)))
+        else:
+            self._regex = None
+
+    def __len__(self):
+        return len(self.words)
+
+    def search(self, content, normalized=False):
+        """Returns the filtered word found in content, or None
+
+        normalized tells that content went through normalize() already."""
+        if self._regex is None:
+            return None
+        if not normalized:
+            content = normalize(content)
+        m = self._regex.search(content)
+        return self.words[m.group()] if m else None
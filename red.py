@@ -1,7 +1,11 @@
 from discord.ext import commands
 import discord
 from cogs.utils.settings import Settings
+from cogs.utils.dataIO import dataIO
+from cogs.utils.manifest import CogManifest
+from cogs.utils.wordfilter import normalize
 import json
+import re
 import asyncio
 import os
 import time
@@ -10,6 +14,9 @@ import logging
 import logging.handlers
 import shutil
 import traceback
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 #
 #  Red, a Discord bot by Twentysix, based on discord.py and its command extension
@@ -31,9 +38,117 @@ bot = commands.Bot(command_prefix=["_"], formatter=formatter,
 
 settings = Settings()
 
+cog_manifest = CogManifest()
+
 from cogs.utils import checks
 
 
+class PrefixMatcher:
+    """Finds the command prefix a message starts with
+
+    All the prefixes are compiled into a single regex, longest first, so a
+    lookup is one match call that returns the longest prefix."""
+
+    def __init__(self, prefixes=()):
+        self.compile(prefixes)
+
+    def compile(self, prefixes):
+        ordered = sorted(set(prefixes), key=len, reverse=True)
+        if ordered:
+            self._regex = re.compile("|".join(map(re.escape, ordered)))
+        else:
+            self._regex = None
+
+    def match(self, content):
+        if self._regex is None:
+            return None
+        m = self._regex.match(content)
+        return m.group() if m else None
+
+
+prefix_matcher = PrefixMatcher()
+
+
+class MessageContext:
+    """Per-message facts shared by every message handler
+
+    Built once per message by MessagePipeline. The prefix, the ignore
+    status and the normalized content are only computed if a handler asks
+    for them."""
+
+    def __init__(self, message):
+        self.message = message
+        self.author = message.author
+        self.channel = message.channel
+        self.server = message.server
+        self.private = message.channel.is_private
+        self.own = message.author.id == bot.user.id
+        self._prefix = False
+        self._allowed = None
+        self._normalized = None
+
+    @property
+    def prefix(self):
+        """The command prefix the message starts with, or None"""
+        if self._prefix is False:
+            self._prefix = get_prefix(self.message.content)
+        return self._prefix
+
+    @property
+    def allowed(self):
+        """Whether the author may use the bot here, see user_allowed"""
+        if self._allowed is None:
+            self._allowed = user_allowed(self.message)
+        return self._allowed
+
+    @property
+    def normalized(self):
+        """The content folded by wordfilter.normalize, for content checks"""
+        if self._normalized is None:
+            self._normalized = normalize(self.message.content)
+        return self._normalized
+
+
+class MessagePipeline:
+    """Runs the on_message handlers of the core and the cogs in one pass
+
+    Handlers are coroutines taking a MessageContext. They run by ascending
+    priority and a handler returning True stops the ones after it, e.g. a
+    filtered message doesn't reach the commands."""
+
+    FILTER = 10
+    OBSERVER = 50
+    ALIASES = 90 # Aliases and custom commands
+    COMMANDS = 100
+
+    def __init__(self):
+        self.handlers = []
+
+    def register(self, handler, priority=OBSERVER):
+        self.handlers.append((priority, handler))
+        self.handlers.sort(key=lambda h: h[0])
+
+    def unregister(self, handler):
+        self.handlers = [h for h in self.handlers if h[1] != handler]
+
+    def unregister_module(self, module):
+        """Drops the handlers of an unloaded cog"""
+        self.handlers = [h for h in self.handlers
+                         if h[1].__module__ != module]
+
+    async def dispatch(self, message):
+        ctx = MessageContext(message)
+        for priority, handler in self.handlers:
+            try:
+                if await handler(ctx):
+                    break
+            except Exception as e:
+                logger.exception(e)
+
+
+message_pipeline = MessagePipeline()
+
+
 @bot.event
 async def on_ready():
     users = str(len(set(bot.get_all_members())))
@@ -67,8 +182,39 @@ async def on_command(command, ctx):
 
 @bot.event
 async def on_message(message):
-    if user_allowed(message):
-        await bot.process_commands(message)
+    await message_pipeline.dispatch(message)
+
+
+async def process_commands(ctx):
+    if ctx.prefix is not None and ctx.allowed:
+        await bot.process_commands(ctx.message)
+
+message_pipeline.register(process_commands, MessagePipeline.COMMANDS)
+
+
+@bot.event
+async def on_member_update(before, after):
+    checks.resolver.invalidate_member(after)
+
+
+@bot.event
+async def on_member_remove(member):
+    checks.resolver.invalidate_member(member)
+
+
+@bot.event
+async def on_server_role_create(role):
+    checks.resolver.invalidate_server(role.server)
+
+
+@bot.event
+async def on_server_role_update(before, after):
+    checks.resolver.invalidate_server(after.server)
+
+
+@bot.event
+async def on_server_role_delete(role):
+    checks.resolver.invalidate_server(role.server)
 
 
 @bot.event
@@ -91,39 +237,20 @@ async def send_cmd_help(ctx):
             await bot.send_message(ctx.message.channel, page)
 
 
-def user_allowed(message):
+def get_prefix(content):
+    """Returns the longest command prefix content starts with, or None"""
+    return prefix_matcher.match(content)
 
-    author = message.author
 
-    mod = bot.get_cog('Mod')
+def set_prefixes(prefixes):
+    bot.command_prefix = prefixes
+    prefix_matcher.compile(prefixes)
+
 
+def user_allowed(message):
+    mod = bot.get_cog('Mod')
     if mod is not None:
-        if settings.owner == author.id:
-            return True
-        if not message.channel.is_private:
-            server = message.server
-            names = (settings.get_server_admin(
-                server), settings.get_server_mod(server))
-            results = map(
-                lambda name: discord.utils.get(author.roles, name=name), names)
-            for r in results:
-                if r is not None:
-                    return True
-
-        if author.id in mod.blacklist_list:
-            return False
-
-        if mod.whitelist_list:
-            if author.id not in mod.whitelist_list:
-                return False
-
-        if not message.channel.is_private:
-            if message.server.id in mod.ignore_list["SERVERS"]:
-                return False
-
-            if message.channel.id in mod.ignore_list["CHANNELS"]:
-                return False
-        return True
+        return mod.is_message_allowed(message)
     else:
         return True
 
@@ -267,6 +394,15 @@ def get_answer():
         return False
 
 
+def get_cog(cog):
+    """Returns the autoload setting of cog: True, False or "lazy" """
+    try:
+        with open('data/red/cogs.json', "r") as f:
+            return json.load(f).get(cog, False)
+    except:
+        return False
+
+
 def set_cog(cog, value):
     with open('data/red/cogs.json', "r") as f:
         data = json.load(f)
@@ -275,6 +411,108 @@ def set_cog(cog, value):
         f.write(json.dumps(data))
 
 
+CHECK_FUNCTIONS = ("check_folders", "check_folder", "check_files",
+                   "check_file")
+
+
+def prepare_cog(extension):
+    """Imports a cog and runs its check_* functions
+
+    Runs in a worker thread. Returns the time spent importing and the
+    time spent on the data files."""
+    start = time.perf_counter()
+    module = importlib.import_module(extension)
+    imported = time.perf_counter()
+    for name in CHECK_FUNCTIONS:
+        check = getattr(module, name, None)
+        if callable(check):
+            check()
+    return imported - start, time.perf_counter() - imported
+
+
+@contextmanager
+def checks_done(extension):
+    """Makes the check_* functions of a prepared cog do nothing, so its
+    setup() doesn't run them a second time"""
+    module = sys.modules[extension]
+    saved = {}
+    for name in CHECK_FUNCTIONS:
+        check = getattr(module, name, None)
+        if callable(check):
+            saved[name] = check
+            setattr(module, name, lambda: None)
+    try:
+        yield
+    finally:
+        for name, check in saved.items():
+            setattr(module, name, check)
+
+
+def print_cog_timings(timings, elapsed):
+    if not timings:
+        return
+    row = "{:<20}{:>10}{:>10}{:>10}{:>10}"
+    print(row.format("Cog", "import", "files", "setup", "total"))
+    ms = lambda t: "{:.0f}ms".format(t * 1000)
+    for extension, times in sorted(timings.items(),
+                                   key=lambda t: -sum(t[1])):
+        print(row.format(extension[5:], *map(ms, times + (sum(times),))))
+    print("{} cogs loaded in {}\n".format(len(timings), ms(elapsed)))
+
+
+lazy_cogs = {}  # Extension: names of its stub commands
+lazy_activations = {}  # Extension: task loading it
+
+
+def register_lazy_cog(extension):
+    """Adds placeholder commands for a cog that is loaded on first use
+
+    The placeholders are taken from the cog manifest. Invoking one loads
+    the real cog and runs the message again through the commands."""
+    async def stub(ctx):
+        await activate_lazy_cog(extension)
+        await bot.process_commands(ctx.message)
+
+    names = []
+    for name, info in cog_manifest.commands(extension).items():
+        if name in bot.commands:
+            continue
+        aliases = [a for a in info["ALIASES"] if a not in bot.commands]
+        bot.add_command(commands.Command(name, stub, pass_context=True,
+                                         aliases=aliases, help=info["HELP"]))
+        names.append(name)
+    lazy_cogs[extension] = names
+
+
+def remove_lazy_cog(extension):
+    """Removes the placeholder commands of extension, if any"""
+    for name in lazy_cogs.pop(extension, ()):
+        bot.remove_command(name)
+
+
+async def activate_lazy_cog(extension):
+    task = lazy_activations.get(extension)
+    if task is None:
+        task = bot.loop.create_task(_activate_lazy_cog(extension))
+        lazy_activations[extension] = task
+    try:
+        await task
+    finally:
+        lazy_activations.pop(extension, None)
+
+
+async def _activate_lazy_cog(extension):
+    start = time.perf_counter()
+    await bot.loop.run_in_executor(None, prepare_cog, extension)
+    remove_lazy_cog(extension)
+    with checks_done(extension):
+        bot.load_extension(extension)
+    cog_manifest.record_load(extension, bot)
+    await bot.get_cog('Owner').disable_commands()
+    print("Loaded {} on first use in {:.0f}ms".format(
+        extension, (time.perf_counter() - start) * 1000))
+
+
 def load_cogs():
     try:
         if sys.argv[1] == "--no-prompt":
@@ -289,6 +527,7 @@ def load_cogs():
             registry = json.load(f)
     except:
         registry = {}
+    saved_registry = dict(registry)
 
     bot.load_extension('cogs.owner')
     owner_cog = bot.get_cog('Owner')
@@ -302,6 +541,7 @@ def load_cogs():
         exit(1)
 
     failed = []
+    to_load = []
     extensions = owner_cog._list_cogs()
     for extension in extensions:
         if extension.lower() == "cogs.owner":
@@ -314,17 +554,40 @@ def load_cogs():
                 registry[extension] = False
                 continue
             registry[extension] = True
-        if not registry[extension]:
-            continue
+        if registry[extension] == "lazy" and \
+                cog_manifest.commands(extension):
+            register_lazy_cog(extension)
+        elif registry[extension]:
+            to_load.append(extension)
+
+    # Importing the cogs and creating their data files doesn't need the
+    # bot, so it's done in parallel. setup() then runs in order, without
+    # repeating the checks. The data the cogs load in __init__ is still
+    # read there, one cog after the other.
+    start = time.perf_counter()
+    timings = {}
+    with ThreadPoolExecutor(max_workers=min(8, len(to_load) or 1)) as pool:
+        prepared = {e: pool.submit(prepare_cog, e) for e in to_load}
+    for extension in to_load:
         try:
-            owner_cog._load_cog(extension)
+            import_time, files_time = prepared[extension].result()
+            setup_start = time.perf_counter()
+            with checks_done(extension):
+                bot.load_extension(extension)
+            timings[extension] = (import_time, files_time,
+                                  time.perf_counter() - setup_start)
+            cog_manifest.record_load(extension, bot)
         except Exception as e:
             print("{}: {}".format(e.__class__.__name__, str(e)))
             logger.exception(e)
             failed.append(extension)
             registry[extension] = False
+    print_cog_timings(timings, time.perf_counter() - start)
+    if lazy_cogs:
+        print("Loaded on first use: {}\n".format(
+            ", ".join(e[5:] for e in sorted(lazy_cogs))))
 
-    if extensions:
+    if registry != saved_registry:
         with open('data/red/cogs.json', "w") as f:
             f.write(json.dumps(registry))
 
@@ -346,10 +609,10 @@ def main():
     set_logger()
     owner_cog = load_cogs()
     if settings.prefixes != []:
-        bot.command_prefix = settings.prefixes
+        set_prefixes(settings.prefixes)
     else:
         print("No prefix set. Defaulting to !")
-        bot.command_prefix = ["!"]
+        set_prefixes(["!"])
         if settings.owner != "id_here":
             print("Use !set prefix to set it.")
         else:
@@ -359,6 +622,7 @@ def main():
               "yourself as owner.".format(bot.command_prefix[0]))
     else:
         owner_cog.owner.hidden = True  # Hides the set owner command from help
+    bot.loop.create_task(dataIO.flusher(bot.loop))
     print("-- Logging in.. --")
     print("Make sure to keep your bot updated by using: git pull")
     print("and: pip3 install --upgrade git+https://github.com/Rapptz/"
@@ -394,4 +658,5 @@ if __name__ == '__main__':
         logger.error(traceback.format_exc())
         loop.run_until_complete(bot.logout())
     finally:
+        dataIO.close()  # Writes whatever the write-behind store still holds
         loop.close()
\ No newline at end of file